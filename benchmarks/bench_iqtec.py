@@ -0,0 +1,105 @@
+"""Scaling benchmarks of the IQtec integration against a simulated controller.
+
+Every scenario sets up a config entry against a fake controller, then drives
+the coordinator refresh loop while a fraction of the values changes between
+polls. One JSON line per scenario is appended to the file named by
+IQTEC_BENCH_OUTPUT (bench_output.txt by default).
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from time import perf_counter, thread_time
+import tracemalloc
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.core import HomeAssistant
+
+from .common import StateWriteCounter, async_write_result, create_entry, summary
+from .fake_controller import FakeController
+
+# Name -> rooms, sunblinds, devices
+SCENARIOS = {
+    "small": (4, 4, 4),
+    "medium": (20, 20, 25),
+    "large": (60, 60, 150),
+}
+POLLS = 50
+# Fraction of the volatile values changing between polls
+CHURN = 0.1
+
+
+async def async_poll(
+    hass: HomeAssistant, entry: MockConfigEntry, controller: FakeController
+) -> tuple[list[float], list[float]]:
+    """Run the polls, return the latency and event loop time of each."""
+    coordinator = entry.runtime_data.coordinator
+    latencies, loop_times = [], []
+    for _ in range(POLLS):
+        controller.churn(CHURN)
+        start, cpu = perf_counter(), thread_time()
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        loop_times.append(thread_time() - cpu)
+        latencies.append(perf_counter() - start)
+    return latencies, loop_times
+
+
+@pytest.mark.parametrize(
+    "fake_controller", list(SCENARIOS.values()), ids=list(SCENARIOS), indirect=True
+)
+async def bench_scaling(
+    hass: HomeAssistant, fake_controller: FakeController, request: pytest.FixtureRequest
+) -> None:
+    """Measure setup, polling and memory of one scenario."""
+    entry = create_entry(hass, fake_controller.host)
+    counter = StateWriteCounter(hass)
+
+    start = perf_counter()
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    setup_time = perf_counter() - start
+
+    counter.writes = 0
+    requests = fake_controller.requests
+    latencies, loop_times = await async_poll(hass, entry, fake_controller)
+    poll_writes = counter.writes
+    poll_requests = fake_controller.requests - requests
+
+    # Traced separately, tracing would distort the timings above
+    tracemalloc.start()
+    try:
+        assert await hass.config_entries.async_reload(entry.entry_id)
+        # Rediscovery behind the cached topology runs in the background
+        await hass.async_block_till_done(wait_background_tasks=True)
+        await async_poll(hass, entry, fake_controller)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    await async_write_result(
+        hass,
+        {
+            "benchmark": "scaling",
+            "scenario": request.node.callspec.id,
+            "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+            "rooms": len(fake_controller.rooms),
+            "sunblinds": len(fake_controller.sunblinds),
+            "devices": len(fake_controller.devices),
+            "entities": len(hass.states.async_all()),
+            "polls": POLLS,
+            "churn": CHURN,
+            "setup_s": round(setup_time, 4),
+            "poll_latency_ms": summary(latencies),
+            "loop_time_per_poll_ms": summary(loop_times),
+            "state_writes_per_poll": poll_writes / POLLS,
+            "state_writes_per_s": round(poll_writes / sum(latencies), 1),
+            "requests_per_poll": poll_requests / POLLS,
+            "peak_memory_kib": peak // 1024,
+        },
+    )
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
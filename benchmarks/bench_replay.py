@@ -0,0 +1,102 @@
+"""Replay of recorded controller traffic.
+
+IQTEC_REPLAY names a recording made with the iqtec.start_recording service,
+without it the simulated controller is recorded first. Records are replayed
+as fast as possible, IQTEC_REPLAY_REALTIME=1 keeps the recorded timing.
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+import os
+from pathlib import Path
+from time import perf_counter, thread_time
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.iqtec.replay import IqTecRecording, IqTecReplayClient
+from homeassistant.components.switch import DOMAIN as SWITCH_DOMAIN, SERVICE_TURN_ON
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant
+
+from .bench_iqtec import SCENARIOS, async_poll
+from .common import StateWriteCounter, async_write_result, create_entry
+from .fake_controller import FakeController
+
+REPLAY = os.environ.get("IQTEC_REPLAY")
+REALTIME = os.environ.get("IQTEC_REPLAY_REALTIME") == "1"
+
+
+async def _async_record(
+    hass: HomeAssistant, controller: FakeController, path: str
+) -> None:
+    """Record polls and a command of the simulated controller."""
+    entry = create_entry(hass, controller.host)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = entry.runtime_data.coordinator
+    coordinator.async_start_recording(path)
+    await async_poll(hass, entry, controller)
+    switch = hass.states.async_entity_ids(SWITCH_DOMAIN)[0]
+    await hass.services.async_call(
+        SWITCH_DOMAIN, SERVICE_TURN_ON, {ATTR_ENTITY_ID: switch}, blocking=True
+    )
+    await async_poll(hass, entry, controller)
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    await hass.config_entries.async_remove(entry.entry_id)
+
+
+@pytest.mark.parametrize(
+    "fake_controller", [SCENARIOS["medium"]], ids=["medium"], indirect=True
+)
+async def bench_replay(
+    hass: HomeAssistant, fake_controller: FakeController, tmp_path: Path
+) -> None:
+    """Measure the coordinator and entities processing a recording."""
+    if (path := REPLAY) is None:
+        path = str(tmp_path / "recording.jsonl.gz")
+        await _async_record(hass, fake_controller, path)
+    recording = await hass.async_add_executor_job(IqTecRecording.load, path)
+    client = IqTecReplayClient(hass, recording)
+
+    entry = create_entry(hass, "replay")
+    counter = StateWriteCounter(hass)
+    with (
+        patch("custom_components.iqtec.IqTecApiClient", return_value=client),
+        patch(
+            "custom_components.iqtec.IqTecDiscoveryCache.async_load",
+            return_value=recording.topology,
+        ),
+        patch("custom_components.iqtec._async_revalidate"),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    counter.writes = 0
+    start, cpu = perf_counter(), thread_time()
+    polls = await client.async_replay(entry.runtime_data.coordinator, realtime=REALTIME)
+    await hass.async_block_till_done()
+    loop_time, elapsed = thread_time() - cpu, perf_counter() - start
+
+    await async_write_result(
+        hass,
+        {
+            "benchmark": "replay",
+            "recording": os.path.basename(path),
+            "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+            "realtime": REALTIME,
+            "entities": len(hass.states.async_all()),
+            "records": len(recording.records),
+            "polls": polls,
+            "recorded_s": recording.duration,
+            "replay_s": round(elapsed, 4),
+            "loop_time_per_poll_ms": round(loop_time / max(polls, 1) * 1000, 3),
+            "state_writes_per_poll": counter.writes / max(polls, 1),
+            "state_writes_per_s": round(counter.writes / elapsed, 1),
+        },
+    )
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,75 @@
+"""Helpers shared by the benchmarks."""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+from typing import Any
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.iqtec.const import (
+    CONF_API_INTERVAL,
+    CONF_ROOM_INTERVAL,
+    DOMAIN,
+)
+from homeassistant.const import EVENT_STATE_CHANGED, EVENT_STATE_REPORTED
+from homeassistant.core import Event, HomeAssistant, callback
+
+OUTPUT = os.environ.get("IQTEC_BENCH_OUTPUT", "bench_output.txt")
+
+
+def create_entry(hass: HomeAssistant, host: str) -> MockConfigEntry:
+    """Add a config entry whose polls are driven by the benchmark."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": host, "cover_use_short_tilt": False},
+        # Worst case, every poll refreshes every tier
+        options={CONF_ROOM_INTERVAL: 0, CONF_API_INTERVAL: 0},
+        unique_id=f"iqtec_platrom_{host}",
+        pref_disable_polling=True,
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+class StateWriteCounter:
+    """Counts state writes, including those that do not change the state."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Start counting."""
+        self.writes = 0
+        hass.bus.async_listen(EVENT_STATE_CHANGED, self._async_count)
+        # Writes that do not change the state are only fired to filtered listeners
+        hass.bus.async_listen(EVENT_STATE_REPORTED, self._async_count, _async_any)
+
+    @callback
+    def _async_count(self, event: Event) -> None:
+        self.writes += 1
+
+
+@callback
+def _async_any(event_data: Any) -> bool:
+    return True
+
+
+def summary(samples: list[float]) -> dict[str, float]:
+    """Summarize samples in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "mean": round(statistics.fmean(ordered) * 1000, 3),
+        "p50": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95": round(ordered[int(len(ordered) * 0.95)] * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def async_write_result(hass: HomeAssistant, result: dict[str, Any]) -> None:
+    """Append a result line to the output file."""
+    await hass.async_add_executor_job(_write_result, result)
+
+
+def _write_result(result: dict[str, Any]) -> None:
+    with open(OUTPUT, "a", encoding="utf-8") as file:
+        file.write(json.dumps(result) + "\n")
@@ -0,0 +1,23 @@
+"""Fixtures for the IQtec benchmarks."""
+
+from collections.abc import Iterator
+
+import pytest
+
+from .fake_controller import FakeController
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> None:
+    """Load the integration from custom_components."""
+
+
+@pytest.fixture
+def fake_controller(
+    request: pytest.FixtureRequest, socket_enabled: None
+) -> Iterator[FakeController]:
+    """Serve a simulated controller of the requested size."""
+    controller = FakeController(*request.param)
+    controller.start()
+    yield controller
+    controller.stop()
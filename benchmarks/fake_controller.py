@@ -0,0 +1,393 @@
+"""A simulated IQtec controller for the benchmarks.
+
+The controller speaks the protocol of the real one, so the piqtec Controller
+enumerates and polls it unchanged: ``/proj/data.xml`` lists the APIs, and
+``/control/?`` takes ``;`` separated paths answered with ``PATH=VALUE``
+lines. A path ending in ``/`` reads a whole structure, a ``PATH=VALUE``
+item writes the value. Sunblind commands move the sunblinds over time, like
+the real motors do. It is served from its own thread, so the event loop of
+Home Assistant only runs integration code.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, fields
+import json
+import random
+import threading
+from time import monotonic
+from xml.etree import ElementTree
+
+from aiohttp import web
+from piqtec.constants import (
+    MOVE_TIME_UNITS,
+    ROOM_VARS,
+    SUNBLIND_COMMANDS,
+    SUNBLIND_EXTENDED,
+    SUNBLIND_TILT_CLOSED,
+    SUNBLIND_VARS,
+    SYSTEM_VARS,
+    TILT_TIME_OFFSET,
+)
+from piqtec.unit.room import RoomState
+from piqtec.unit.sunblind import SunblindState
+from piqtec.unit.system import SystemState
+
+SWITCH_TYPES = ("OnOff", "OnOffAuto", "Temperature", "byte")
+SENSOR_TYPES = ("bool", "Temperature", "float", "short")
+APIS_PER_DEVICE = 8
+CALENDARS = 4
+
+_XML_TYPES = {bool: "bool", int: "short", float: "float", str: "string"}
+
+
+@dataclass(slots=True)
+class _Motion:
+    """A sunblind moving from where a command started it."""
+
+    start: float
+    position: int
+    rotation: int
+    # 1 down, -1 up
+    direction: int
+    # Milliseconds the motor runs, None until the end is reached
+    duration: float | None
+    # Milliseconds before the motor moves the sunblind
+    dead_time: float = 0.0
+
+
+def _random_value(rnd: random.Random, typ: str) -> str:
+    match typ:
+        case "OnOff" | "bool":
+            return str(rnd.randint(0, 1))
+        case "OnOffAuto":
+            return str(rnd.randint(0, 2))
+        case "Temperature":
+            return f"{rnd.uniform(15, 25):.1f}"
+        case "byte":
+            return str(rnd.randint(0, 255))
+        case "short":
+            return str(rnd.randint(-1000, 1000))
+        case _:
+            return f"{rnd.uniform(0, 100):.3f}"
+
+
+class FakeController:
+    """IQtec controller with N rooms, M sunblinds and K devices."""
+
+    def __init__(self, rooms: int, sunblinds: int, devices: int, seed: int = 0) -> None:
+        """Build the controller contents."""
+        self._random = random.Random(seed)
+        # Path -> value
+        self.values: dict[str, str] = {}
+        # Structure path -> paths read with it
+        self._structures: dict[str, list[str]] = {}
+        self._xml = ElementTree.Element("data")
+        # Values that change on their own, like measured temperatures
+        self._volatile: list[tuple[str, str]] = []
+        self.rooms: list[str] = []
+        self.sunblinds: list[str] = []
+        self.devices: list[str] = []
+        self.requests = 0
+        # Seconds each request takes, and the most requests handled at once
+        self.delay = 0.0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        # Store written numbers in the controller's own format
+        self.normalize = False
+        # Controller milliseconds per real millisecond, to speed up motion
+        self.time_scale = 1.0
+        # Sunblind id -> path of each state field
+        self._sunblinds: dict[str, dict[str, str]] = {}
+        # Command path -> sunblind id
+        self._commands: dict[str, str] = {}
+        self._motions: dict[str, _Motion] = {}
+        self._port = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+        self._add_unit(
+            "SYSTEM",
+            SYSTEM_VARS,
+            SystemState,
+            writable={SYSTEM_VARS.set_heat},
+            set_heat="1",
+            out_temperature="5.0",
+        )
+
+        for n in range(rooms):
+            idx = f"R{n}"
+            self.rooms.append(idx)
+            paths = self._add_unit(
+                idx,
+                ROOM_VARS,
+                RoomState,
+                name=f"Room {n}",
+                actual_temperature=f"{self._random.uniform(18, 24):.1f}",
+                requested_temperature="21.0",
+                room_mode="0",
+                calendar_number=str(n % CALENDARS),
+                heating_enabled="1",
+                heating=str(n % 2),
+            )
+            self._volatile.append((paths["actual_temperature"], "Temperature"))
+
+        for n in range(sunblinds):
+            idx = f"R{n % max(rooms, 1)}_SUNBLIND{n}"
+            self.sunblinds.append(idx)
+            self._sunblinds[idx] = paths = self._add_unit(
+                idx,
+                SUNBLIND_VARS,
+                SunblindState,
+                name=f"Sunblind {n}",
+                en="1",
+                move_time="60",
+                tilt_time="1",
+                full_time_time=str(1500 * (n % 2)),
+            )
+            self._commands[paths["command"]] = idx
+
+        for n in range(devices):
+            idx = f"D{n}"
+            self.devices.append(idx)
+            apis = {}
+            writable = set()
+            for k in range(APIS_PER_DEVICE):
+                if k % 2:
+                    typ = SENSOR_TYPES[(k // 2) % len(SENSOR_TYPES)]
+                    name = f"SENSOR{k}"
+                else:
+                    typ = SWITCH_TYPES[(k // 2) % len(SWITCH_TYPES)]
+                    name = f"SWITCH{k}"
+                    writable.add(name)
+                apis[name] = (typ, _random_value(self._random, typ))
+            paths = self._add_structure(idx, apis, writable)
+            self._volatile.extend(
+                (paths[name], typ)
+                for name, (typ, _) in apis.items()
+                if name not in writable
+            )
+
+        for n in range(CALENDARS):
+            path = f"2/{len(self._structures)}/0"
+            self._structures[f"2/{len(self._structures)}/"] = [path]
+            self.values[path] = json.dumps({"Name": f"Calendar {n}"})
+            self._add_api(
+                category="calendar",
+                name=f"_CALENDAR_{n:02}",
+                access="RU",
+                type="string",
+                structure_id=path.split("/")[1],
+                offset="0",
+            )
+
+    def _add_api(self, **attrib: str) -> None:
+        ElementTree.SubElement(self._xml, "api", attrib | {"param": "0"})
+
+    def _add_structure(
+        self, idx: str, apis: dict[str, tuple[str, str]], writable: set[str]
+    ) -> dict[str, str]:
+        """Add a driver structure of APIs with their types and values.
+
+        Returns the path of each API.
+        """
+        structure_id = len(self._structures)
+        structure = f"1/{structure_id}/"
+        paths = {}
+        for offset, (name, (typ, value)) in enumerate(apis.items()):
+            paths[name] = path = f"{structure}{offset}"
+            self.values[path] = value
+            self._add_api(
+                category="driver",
+                name=f"{idx}.{name}",
+                access="RU" if name in writable else "R",
+                type=typ,
+                structure_id=str(structure_id),
+                offset=str(offset),
+            )
+        self._structures[structure] = list(paths.values())
+        return paths
+
+    def _add_unit(
+        self,
+        idx: str,
+        variables: type,
+        state_cls: type,
+        writable: set[str] | None = None,
+        **values: str,
+    ) -> dict[str, str]:
+        """Add a unit with all the variables piqtec reads, writable by default.
+
+        Returns the path of each state field.
+        """
+        types = {f.name: f.type for f in fields(state_cls)}
+        apis = {}
+        for var in variables:
+            typ = types[var.name]
+            default = "" if typ is str else "0"
+            apis[var.value] = (
+                _XML_TYPES.get(typ, "float"),
+                values.get(var.name, default),
+            )
+        paths = self._add_structure(
+            idx, apis, set(apis) if writable is None else writable
+        )
+        return {var.name: paths[var.value] for var in variables}
+
+    @property
+    def host(self) -> str:
+        """Return the host the integration connects to."""
+        return f"127.0.0.1:{self._port}"
+
+    def churn(self, fraction: float) -> None:
+        """Change a fraction of the volatile values."""
+        count = round(len(self._volatile) * fraction)
+        for path, typ in self._random.sample(self._volatile, count):
+            self.values[path] = _random_value(self._random, typ)
+
+    def sunblind_position(self, idx: str) -> tuple[int, int]:
+        """Return the current position and rotation of a sunblind."""
+        self._move(idx)
+        return self._sunblind(idx, "position"), self._sunblind(idx, "rotation")
+
+    def _sunblind(self, idx: str, name: str) -> int:
+        return int(self.values[self._sunblinds[idx][name]])
+
+    def _command(self, idx: str, command: int) -> None:
+        """Start or stop the motor of a sunblind."""
+        self._move(idx)
+        self._motions.pop(idx, None)
+        match command:
+            case SUNBLIND_COMMANDS.UP | SUNBLIND_COMMANDS.DOWN:
+                direction = 1 if command == SUNBLIND_COMMANDS.DOWN else -1
+                duration, dead_time = None, 0.0
+            case SUNBLIND_COMMANDS.STEP_UP | SUNBLIND_COMMANDS.STEP_DOWN:
+                direction = 1 if command == SUNBLIND_COMMANDS.STEP_DOWN else -1
+                duration = self._sunblind(idx, "step_time")
+                dead_time = TILT_TIME_OFFSET
+            case _:
+                self._set_outputs(idx, 0)
+                return
+        self._motions[idx] = _Motion(
+            monotonic(),
+            self._sunblind(idx, "position"),
+            self._sunblind(idx, "rotation"),
+            direction,
+            duration,
+            dead_time,
+        )
+        self._set_outputs(idx, direction)
+
+    @staticmethod
+    def _normalized(value: str) -> str:
+        """Return a written number like 5.0 as 5, and 21.5 as 21.50."""
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+        return str(int(number)) if number.is_integer() else f"{number:.2f}"
+
+    def _set_outputs(self, idx: str, direction: int) -> None:
+        paths = self._sunblinds[idx]
+        self.values[paths["out_dn_1"]] = str(int(direction > 0))
+        self.values[paths["out_up_1"]] = str(int(direction < 0))
+
+    def _move(self, idx: str) -> None:
+        """Update a moving sunblind to the current time.
+
+        The motor first tilts the slats to the end of its direction, then
+        moves the sunblind, until its step time passed or the end is reached.
+        """
+        if (motion := self._motions.get(idx)) is None:
+            return
+        elapsed = (monotonic() - motion.start) * 1000 * self.time_scale
+        if motion.duration is not None:
+            elapsed = min(elapsed, motion.duration)
+        elapsed = max(elapsed - motion.dead_time, 0)
+        tilt_time = self._sunblind(idx, "full_time_time")
+        move_time = self._sunblind(idx, "move_time") * MOVE_TIME_UNITS
+        tilt_target = SUNBLIND_TILT_CLOSED if motion.direction > 0 else 0
+        tilt_left = abs(tilt_target - motion.rotation)
+        tilting = tilt_left / SUNBLIND_TILT_CLOSED * tilt_time
+        if elapsed < tilting:
+            rotation = motion.rotation + motion.direction * round(
+                elapsed / tilt_time * SUNBLIND_TILT_CLOSED
+            )
+            position = motion.position
+        else:
+            rotation = tilt_target
+            travel = round((elapsed - tilting) / move_time * SUNBLIND_EXTENDED)
+            position = min(
+                max(motion.position + motion.direction * travel, 0), SUNBLIND_EXTENDED
+            )
+        paths = self._sunblinds[idx]
+        self.values[paths["position"]] = str(position)
+        self.values[paths["rotation"]] = str(rotation)
+        end = SUNBLIND_EXTENDED if motion.direction > 0 else 0
+        if (
+            motion.duration is not None
+            and elapsed + motion.dead_time >= motion.duration
+        ) or (position == end and rotation == tilt_target):
+            del self._motions[idx]
+            self._set_outputs(idx, 0)
+
+    async def _handle_xml(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=ElementTree.tostring(self._xml), content_type="text/xml"
+        )
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.delay:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            try:
+                await asyncio.sleep(self.delay)
+            finally:
+                self._in_flight -= 1
+        for idx in list(self._motions):
+            self._move(idx)
+        lines = []
+        for item in request.query_string.split(";"):
+            path, sep, value = item.partition("=")
+            if sep:
+                self.values[path] = self._normalized(value) if self.normalize else value
+                if (idx := self._commands.get(path)) is not None:
+                    self._command(idx, int(value))
+            for read in self._structures.get(path, [path]):
+                lines.append(f"{read}={self.values.get(read, '!')}")
+        return web.Response(text="\n".join(lines), charset="windows-1250")
+
+    def start(self) -> None:
+        """Start serving from a background thread."""
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run, args=(started,), name="fake-iqtec", daemon=True
+        )
+        self._thread.start()
+        if not started.wait(10) or not self._port:
+            raise RuntimeError("Fake controller failed to start")
+
+    def _run(self, started: threading.Event) -> None:
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app.router.add_get("/proj/data.xml", self._handle_xml)
+        app.router.add_get("/control/", self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        try:
+            loop.run_until_complete(runner.setup())
+            loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", 0).start())
+            self._port = runner.addresses[0][1]
+        finally:
+            started.set()
+        loop.run_forever()
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+    def stop(self) -> None:
+        """Stop serving."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
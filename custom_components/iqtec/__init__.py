@@ -2,13 +2,33 @@
 
 from __future__ import annotations
 
-from piqtec.controller import Controller
+import asyncio
+import logging
 
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.typing import ConfigType
 
-from .coordinator import IqTecConfigEntry, IqTecCoordinator, IQTecData
+from .api import IqTecApiClient
+from .const import DOMAIN
+from .coordinator import IqTecConfigEntry, IqTecCoordinator, IQTecData, backoff_delay
+from .discovery import (
+    IqTecDiscoveryCache,
+    IqTecTopology,
+    async_calendar_names,
+    async_discover,
+    async_enumerate,
+    async_take_over,
+)
+from .services import async_setup_services
+from .websocket_api import async_setup_websocket_api
+
+_LOGGER = logging.getLogger(__name__)
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 _PLATFORMS: list[Platform] = [
     Platform.BINARY_SENSOR,
@@ -21,24 +41,141 @@ _PLATFORMS: list[Platform] = [
 ]
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the IQtec services and websocket commands."""
+    async_setup_services(hass)
+    async_setup_websocket_api(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: IqTecConfigEntry) -> bool:
-    """Set up IQtec Smart Home from a config entry."""
-    try:
-        hub = await hass.async_add_executor_job(Controller, entry.data["host"])
-    except ConnectionError as err:
-        raise ConfigEntryNotReady(f"Got: {err}") from None
+    """Set up IQtec Smart Home from a config entry.
 
-    coordinator = IqTecCoordinator(hass, entry, hub)
-    await coordinator.async_config_entry_first_refresh()
+    With a cached topology the entities are created right away and the
+    controller is discovered in the background. Otherwise the controller the
+    config flow enumerated is used when there is one, and the calendar names
+    are read while the first status is fetched.
+    """
+    cache = IqTecDiscoveryCache(hass, entry.entry_id)
+    client = IqTecApiClient(hass, entry.data["host"])
+    hub = async_take_over(hass, entry.data["host"])
 
+    if (topology := await cache.async_load()) is None:
+        try:
+            if hub is None:
+                hub = await async_enumerate(hass, entry.data["host"])
+            client.attach(hub)
+            coordinator = IqTecCoordinator(hass, entry, client)
+            calendars, _ = await asyncio.gather(
+                async_calendar_names(hass, hub),
+                coordinator.async_config_entry_first_refresh(),
+            )
+        except ConnectionError as err:
+            raise ConfigEntryNotReady(f"Got: {err}") from None
+        topology = IqTecTopology.from_controller(hub, coordinator.data, calendars)
+        await cache.async_save(topology)
+    else:
+        coordinator = IqTecCoordinator(hass, entry, client)
+        # Discovered in the background, once the runtime data is set
+        entry.async_create_background_task(
+            hass,
+            _async_revalidate(hass, entry, cache, topology),
+            f"{DOMAIN} discovery ({entry.title})",
+            eager_start=False,
+        )
+
+    coordinator.async_set_topology(topology)
+    if not coordinator.raw_entities:
+        _async_remove_entities(
+            hass, entry, {*topology.switch_apis, *topology.sensor_apis}
+        )
     entry.runtime_data = IQTecData(
-        coordinator=coordinator, cover_use_short_tilt=entry.data["cover_use_short_tilt"]
+        coordinator=coordinator,
+        cover_use_short_tilt=entry.data["cover_use_short_tilt"],
     )
     await hass.config_entries.async_forward_entry_setups(entry, _PLATFORMS)
 
     return True
 
 
+async def _async_revalidate(
+    hass: HomeAssistant,
+    entry: IqTecConfigEntry,
+    cache: IqTecDiscoveryCache,
+    cached: IqTecTopology,
+) -> None:
+    """Discover the controller behind a cached topology.
+
+    The entry is reloaded only when the topology actually changed.
+    """
+    failures = 0
+    while True:
+        try:
+            hub, calendars = await async_discover(hass, entry.data["host"])
+            break
+        except ConnectionError as err:
+            failures += 1
+            if failures == 1:
+                _LOGGER.warning("Discovering %s failed, retrying: %s", entry.title, err)
+            await asyncio.sleep(backoff_delay(failures))
+
+    coordinator = entry.runtime_data.coordinator
+    await coordinator.async_attach(hub)
+    if coordinator.data is None:
+        first_data = hass.loop.create_future()
+
+        @callback
+        def _async_first_data() -> None:
+            if coordinator.data is not None and not first_data.done():
+                first_data.set_result(None)
+
+        unsub = coordinator.async_add_listener(_async_first_data)
+        try:
+            await first_data
+        finally:
+            unsub()
+
+    topology = IqTecTopology.from_controller(hub, coordinator.data, calendars)
+    if topology == cached:
+        return
+    _LOGGER.info("Topology of %s changed, reloading", entry.title)
+    await cache.async_save(topology)
+    _async_remove_entities(hass, entry, _unit_ids(cached) - _unit_ids(topology))
+    hass.config_entries.async_schedule_reload(entry.entry_id)
+
+
+def _unit_ids(topology: IqTecTopology) -> set[str]:
+    """Return the ids of all units and APIs of a topology."""
+    return {
+        *topology.rooms,
+        *topology.sunblinds,
+        *topology.switch_apis,
+        *topology.sensor_apis,
+    }
+
+
+@callback
+def _async_remove_entities(
+    hass: HomeAssistant, entry: ConfigEntry, ids: set[str]
+) -> None:
+    """Remove the registered entities of units and APIs.
+
+    Used for units the controller no longer has and for raw API entities
+    once they are turned off.
+    """
+    unique_ids = {f"{DOMAIN}-{idx}" for idx in ids}
+    registry = er.async_get(hass)
+    for entity in er.async_entries_for_config_entry(registry, entry.entry_id):
+        if entity.unique_id in unique_ids:
+            registry.async_remove(entity.entity_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: IqTecConfigEntry) -> bool:
     """Unload a config entry."""
+    await entry.runtime_data.coordinator.async_stop_recording()
     return await hass.config_entries.async_unload_platforms(entry, _PLATFORMS)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached topology of a removed entry."""
+    await IqTecDiscoveryCache(hass, entry.entry_id).async_remove()
@@ -0,0 +1,413 @@
+"""Async client for the IQtec controller."""
+
+from __future__ import annotations
+
+from array import array
+import asyncio
+from collections.abc import Callable, Collection, Iterable, Sequence
+from dataclasses import dataclass, field
+import logging
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+from piqtec.api.generic import DriverAPI
+from piqtec.controller import Controller
+from piqtec.type_helpers import RequestSet, Response, ResponseSet, Set
+from piqtec.unit.room import Room, RoomState
+from piqtec.unit.sunblind import Sunblind, SunblindState
+from piqtec.utils import split_getters_to_chunks
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .commands import CommandFailed, IqTecCommand
+from .const import (
+    API_PATH,
+    MAX_CONCURRENT_REQUESTS,
+    MAX_REQUEST_LENGTH,
+    MAX_REQUESTS_PER_CALL,
+    REQUEST_TIMEOUT,
+)
+
+if TYPE_CHECKING:
+    from .replay import IqTecRecorder
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class IqTecApiValues:
+    """Raw API values decoded once per snapshot.
+
+    Values are stored as floats in slots, with a mask marking the slots whose
+    value the controller reported as an error.
+    """
+
+    __slots__ = ("_valid", "_values")
+
+    def __init__(self, size: int = 0) -> None:
+        """Initialize empty columns."""
+        self._values = array("d", bytes(8 * size))
+        self._valid = bytearray(size)
+
+    @classmethod
+    def decode(
+        cls, slots: dict[str, int], apis: dict[str, str | None]
+    ) -> IqTecApiValues:
+        """Decode the raw values of the APIs that have a slot.
+
+        Slots of APIs that were not fetched are left invalid.
+        """
+        decoded = cls(len(slots))
+        for idx, raw in apis.items():
+            if (slot := slots.get(idx)) is not None:
+                decoded._set(slot, raw)
+        return decoded
+
+    def updated(
+        self, slots: dict[str, int], apis: dict[str, str | None]
+    ) -> IqTecApiValues:
+        """Return a copy with the given raw values decoded again."""
+        updated = IqTecApiValues()
+        updated._values = array("d", self._values)
+        updated._valid = bytearray(self._valid)
+        for idx, raw in apis.items():
+            if (slot := slots.get(idx)) is not None and slot < len(updated._valid):
+                updated._set(slot, raw)
+        return updated
+
+    def _set(self, slot: int, raw: str | None) -> None:
+        """Decode a raw value into a slot."""
+        self._valid[slot] = 0
+        if raw is None or "!" in raw:
+            return
+        try:
+            self._values[slot] = float(raw)
+        except ValueError:
+            return
+        self._valid[slot] = 1
+
+    def get(self, slot: int) -> float | None:
+        """Return the value of a slot, None if it is not valid."""
+        if slot < len(self._valid) and self._valid[slot]:
+            return self._values[slot]
+        return None
+
+
+@dataclass
+class IqTecStatus:
+    """Snapshot of the controller status.
+
+    Raw device APIs are flattened into one table keyed by API id, and
+    decoded into api_values by the coordinator.
+    """
+
+    rooms: dict[str, RoomState] = field(default_factory=dict)
+    sunblinds: dict[str, SunblindState] = field(default_factory=dict)
+    apis: dict[str, str | None] = field(default_factory=dict)
+    api_values: IqTecApiValues = field(
+        default_factory=IqTecApiValues, compare=False, repr=False
+    )
+
+    def merge(self, update: IqTecStatus, slots: dict[str, int]) -> IqTecStatus:
+        """Return the snapshot with the units and APIs of a partial status.
+
+        Tables without updates are shared with this snapshot.
+        """
+        return IqTecStatus(
+            rooms=_merged(self.rooms, update.rooms),
+            sunblinds=_merged(self.sunblinds, update.sunblinds),
+            apis=_merged(self.apis, update.apis),
+            api_values=self.api_values.updated(slots, update.apis)
+            if update.apis
+            else self.api_values,
+        )
+
+    def changed(self, previous: IqTecStatus) -> set[str]:
+        """Return ids whose value differs from the previous snapshot."""
+        return {
+            idx
+            for table, old in (
+                (self.rooms, previous.rooms),
+                (self.sunblinds, previous.sunblinds),
+                (self.apis, previous.apis),
+            )
+            if table is not old
+            for idx, value in table.items()
+            if old.get(idx) != value
+        }
+
+
+def _merged(table: dict[str, Any], update: dict[str, Any]) -> dict[str, Any]:
+    return {**table, **update} if update else table
+
+
+def _selected[T](apis: dict[str, T], api_ids: Collection[str] | None) -> dict[str, T]:
+    if api_ids is None:
+        return apis
+    return {idx: apis[idx] for idx in api_ids if idx in apis}
+
+
+def parse_response(raw: str) -> ResponseSet:
+    """Split a controller response into responses keyed by path."""
+    responses = {}
+    for line in raw.splitlines():
+        path, sep, value = line.partition("=")
+        if sep:
+            responses[path] = Response(path, value)
+    return responses
+
+
+def describe(request: RequestSet) -> str:
+    """Return the setters of a request as the controller receives them."""
+    return ";".join(f"{s.path}={s.value}" for s in request.setters)
+
+
+class IqTecApiClient:
+    """Async IQtec client.
+
+    Requests go over the shared Home Assistant HTTP session, which keeps
+    connections to the controller alive between polls. Only a few requests
+    and a single status fetch are in flight at a time. The piqtec Controller
+    describes the topology, builds the request sets and decodes unit states,
+    its blocking I/O is not used.
+    """
+
+    hub: Controller | None
+
+    def __init__(
+        self, hass: HomeAssistant, host: str, hub: Controller | None = None
+    ) -> None:
+        """Initialize IQtec client.
+
+        The controller can be attached later, when it is discovered in the
+        background.
+        """
+        self.hass = hass
+        self._url = f"http://{host}/{API_PATH}"
+        self._session = async_get_clientsession(hass)
+        self._command_listeners: list[Callable[..., None]] = []
+        self._requests = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._status_lock = asyncio.Lock()
+        self.hub = None
+        self._apis: dict[str, DriverAPI] = {}
+        self.recorder: IqTecRecorder | None = None
+        if hub is not None:
+            self.attach(hub)
+
+    def attach(self, hub: Controller) -> None:
+        """Use a discovered controller."""
+        self.hub = hub
+        self._apis = {
+            idx: api
+            for d in hub.devices.values()
+            for idx, api in (*d.switch_apis.items(), *d.sensor_apis.items())
+        }
+
+    async def _async_get(self, query: str) -> ResponseSet:
+        """Make a single request to the controller."""
+        try:
+            async with (
+                self._requests,
+                self._session.get(
+                    f"{self._url}{query}",
+                    timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                ) as resp,
+            ):
+                if resp.status != 200:
+                    raise ConnectionError(
+                        f"Controller returned HTTP {resp.status} for '{query}'"
+                    )
+                raw = await resp.text(encoding=self.hub.encoding)
+        except (aiohttp.ClientError, TimeoutError) as err:
+            raise ConnectionError(f"Request '{query}' failed: {err}") from err
+        return parse_response(raw)
+
+    async def async_api_call(self, request: RequestSet) -> ResponseSet:
+        """Send a piqtec request set, like the blocking Controller.api_call.
+
+        Getters are split into the chunks piqtec sizes by their expected
+        responses and read concurrently, as far as the request limit allows.
+        Setters are written afterwards, in
+        order, joined into as few requests as the URL length allows.
+        """
+        responses: ResponseSet = {}
+        chunks = split_getters_to_chunks(request.getters)
+        for part in await asyncio.gather(*(self._async_get(c) for c in chunks)):
+            responses.update(part)
+        for query in _setter_queries(request.setters):
+            responses.update(await self._async_get(query))
+        return responses
+
+    @callback
+    def async_add_command_listener(
+        self, listener: Callable[..., None]
+    ) -> CALLBACK_TYPE:
+        """Listen for commands sent to the controller.
+
+        The listener is called with the status tiers the command affects and
+        the commands sent, when known.
+        """
+        self._command_listeners.append(listener)
+        return lambda: self._command_listeners.remove(listener)
+
+    @callback
+    def _async_command_sent(
+        self, *tiers: str, commands: Sequence[IqTecCommand] = ()
+    ) -> None:
+        for listener in self._command_listeners:
+            listener(*tiers, commands=commands)
+
+    def _parse_status(
+        self,
+        data: ResponseSet,
+        rooms: dict[str, Room],
+        sunblinds: dict[str, Sunblind],
+        apis: dict[str, DriverAPI],
+    ) -> IqTecStatus:
+        """Decode the units and APIs of a response."""
+        return IqTecStatus(
+            rooms={idx: r.parse_state(data) for idx, r in rooms.items()},
+            sunblinds={idx: s.parse_state(data) for idx, s in sunblinds.items()},
+            apis={idx: a.parse(data) for idx, a in apis.items()},
+        )
+
+    @property
+    def ready(self) -> bool:
+        """Return if the client can fetch the status."""
+        return self.hub is not None
+
+    async def async_fetch(
+        self,
+        *,
+        rooms: bool = False,
+        sunblinds: bool = False,
+        apis: bool = False,
+        api_ids: Collection[str] | None = None,
+    ) -> IqTecStatus:
+        """Fetch part of the controller status.
+
+        Only the requested tables are read, each unit with its own structure
+        request. Tables that were not requested are left empty. The APIs
+        table holds the given APIs, all of them by default, and only those
+        are requested. Status fetches wait for the one in flight.
+        """
+        if (hub := self.hub) is None:
+            raise ConnectionError("Controller has not been discovered yet")
+        room_units = hub.rooms if rooms else {}
+        sunblind_units = hub.sunblinds if sunblinds else {}
+        api_units = _selected(self._apis, api_ids) if apis else {}
+        request = _summed(
+            u.get_request for u in (*room_units.values(), *sunblind_units.values())
+        )
+        async with self._status_lock:
+            data = await self.async_api_call(request + self._api_request(api_units))
+        return self._parse_status(data, room_units, sunblind_units, api_units)
+
+    def _api_request(self, apis: dict[str, DriverAPI]) -> RequestSet:
+        """Return the request reading APIs.
+
+        A device whose APIs are all read is read as one structure, the
+        others by the paths of the APIs.
+        """
+        requests = []
+        for device in self.hub.devices.values():
+            ids = (*device.switch_apis, *device.sensor_apis)
+            wanted = [idx for idx in ids if idx in apis]
+            if wanted and len(wanted) == len(ids):
+                requests.append(device.get_request)
+            else:
+                requests.extend(apis[idx].get_request() for idx in wanted)
+        return _summed(requests)
+
+    async def async_fetch_units(
+        self, units: Sequence[Room | Sunblind], apis: Sequence[str]
+    ) -> IqTecStatus:
+        """Fetch the status of single rooms, sunblinds and APIs.
+
+        Only the fetched units and APIs are set in the returned status.
+        """
+        if self.hub is None:
+            raise ConnectionError("Controller has not been discovered yet")
+        targets = {id(u) for u in units}
+        api_units = _selected(self._apis, apis)
+        async with self._status_lock:
+            data = await self.async_api_call(
+                _summed(u.get_request for u in units) + self._api_request(api_units)
+            )
+        return self._parse_status(
+            data,
+            {idx: r for idx, r in self.hub.rooms.items() if id(r) in targets},
+            {idx: s for idx, s in self.hub.sunblinds.items() if id(s) in targets},
+            api_units,
+        )
+
+    async def async_update_status(self) -> IqTecStatus:
+        """Fetch the full controller status."""
+        return await self.async_fetch(rooms=True, sunblinds=True, apis=True)
+
+    async def async_execute(self, commands: Sequence[IqTecCommand]) -> None:
+        """Send a batch of commands.
+
+        The request sets are combined into one and checked against the
+        values the controller reports back, numbers by their value. Staged commands stop their units
+        together and read the settled states in one go before.
+        """
+        settled: ResponseSet = {}
+        if staged := [c for c in commands if c.build is not None]:
+            await self.async_api_call(_summed(c.stop for c in staged))
+            settled = await self.async_api_call(
+                _summed(c.unit.get_request for c in staged)
+            )
+        requests = [
+            c.build(settled) if c.build is not None else c.request for c in commands
+        ]
+        if requests:
+            request = _summed(requests)
+            data = await self.async_api_call(request)
+            # A later setter of the same path overwrites an earlier one
+            written = {s.path: s.value for s in request.setters}
+            for path, value in written.items():
+                if path in data and not _same_value(data[path].value, value):
+                    raise CommandFailed(
+                        f"Setting {path} to {value} returned {data[path].value}"
+                    )
+        if self.recorder is not None:
+            self.recorder.record_commands(commands)
+        self._async_command_sent(
+            *{t for c in commands for t in c.tiers}, commands=commands
+        )
+
+
+def _same_value(reported: str, written: str) -> bool:
+    """Return if the controller reports a written value.
+
+    Numbers are compared by value, controllers may format them differently.
+    """
+    try:
+        return float(reported) == float(written)
+    except ValueError:
+        return reported == written
+
+
+def _summed(requests: Iterable[RequestSet]) -> RequestSet:
+    return sum(requests, RequestSet())
+
+
+def _setter_queries(setters: Sequence[Set]) -> list[str]:
+    """Join setters into queries within the request limits."""
+    queries: list[str] = []
+    chunk: list[str] = []
+    length = 0
+    for setter in setters:
+        item = f"{setter.path}={setter.value}"
+        if chunk and (
+            len(chunk) >= MAX_REQUESTS_PER_CALL
+            or length + len(item) >= MAX_REQUEST_LENGTH
+        ):
+            queries.append(";".join(chunk))
+            chunk, length = [], 0
+        chunk.append(item)
+        length += len(item) + 1
+    if chunk:
+        queries.append(";".join(chunk))
+    return queries
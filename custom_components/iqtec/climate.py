@@ -1,5 +1,6 @@
 """IQTec Climate."""
 
+from dataclasses import replace
 import logging
 from typing import Any
 
@@ -16,12 +17,14 @@ from homeassistant.components.climate import (
     HVACMode,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
+from .commands import IqTecCommand
 from .const import DOMAIN
 from .coordinator import IqTecConfigEntry, IqTecCoordinator
+from .deadband import IqTecDeadband
 from .entity import IqTecEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -29,6 +32,43 @@ _LOGGER = logging.getLogger(__name__)
 
 PRESET_ANTIFREEZE = "Anti-Freeze"
 
+# Room setter calls of each mode, in the order they are sent
+HVAC_MODE_CALLS: dict[HVACMode, dict[str, Any]] = {
+    HVACMode.OFF: {"set_room_mode": ROOM_MODES.OFF},
+    HVACMode.HEAT: {
+        "set_room_mode": ROOM_MODES.CALENDAR,
+        "set_correction_mode": ROOM_CORR_MODES.MANUAL,
+    },
+    HVACMode.AUTO: {
+        "set_room_mode": ROOM_MODES.CALENDAR,
+        "set_correction_mode": ROOM_CORR_MODES.NONE,
+    },
+}
+PRESET_CALLS: dict[str, dict[str, Any]] = {
+    PRESET_AWAY: {"set_room_mode": ROOM_MODES.HOLIDAY},
+    PRESET_ANTIFREEZE: {"set_room_mode": ROOM_MODES.ANTIFREEZE},
+}
+# Room state field each setter writes
+SETTER_FIELDS = {
+    "set_room_mode": "room_mode",
+    "set_correction_mode": "correction_status",
+    "set_calendar": "calendar_number",
+    "set_correction_temperature": "requested_temperature",
+}
+
+
+def calendar_calls(calendar: int) -> dict[str, Any]:
+    """Return the room setter calls following a calendar."""
+    return {"set_room_mode": ROOM_MODES.CALENDAR, "set_calendar": calendar}
+
+
+def temperature_calls(temperature: float) -> dict[str, Any]:
+    """Return the room setter calls setting a manual temperature."""
+    return {
+        "set_correction_mode": ROOM_CORR_MODES.MANUAL,
+        "set_correction_temperature": temperature,
+    }
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -37,12 +77,10 @@ async def async_setup_entry(
 ) -> None:
     """Setup Cover entries."""
     coordinator = config_entry.runtime_data.coordinator
-    raw_cals = await hass.async_add_executor_job(coordinator.hub.get_calendar_names)
-    calendars = {
-        int(idx.removeprefix("_CALENDAR_")): calname for idx, calname in raw_cals
-    }
+    topology = coordinator.topology
     async_add_entities(
-        IqTecClimate(coordinator, idx, calendars) for idx in coordinator.hub.rooms
+        IqTecClimate(coordinator, idx, name, topology.calendars)
+        for idx, name in topology.rooms.items()
     )
 
 
@@ -68,24 +106,45 @@ class IqTecClimate(IqTecEntity, ClimateEntity):
 
     temperature_unit = UnitOfTemperature.CELSIUS
 
+    _curated_attributes = (
+        "actual_temperature",
+        "requested_temperature",
+        "room_mode",
+        "correction_status",
+        "calendar_number",
+        "heating_enabled",
+        "heating",
+    )
+
     def __init__(
-        self, coordinator: IqTecCoordinator, idx: str, calendars: dict[int, str]
+        self,
+        coordinator: IqTecCoordinator,
+        idx: str,
+        name: str,
+        calendars: dict[int, str],
     ) -> None:
         """Initialise IQtec Climate."""
         super().__init__(coordinator, idx)
-        self.iqtec_state = coordinator.data.rooms[self.idx]
+        self._attr_name = name
 
         self._attr_device_info = self._default_device_info | DeviceInfo(
-            identifiers={(DOMAIN, idx)}, name=self.iqtec_state.name
+            identifiers={(DOMAIN, idx)}, name=name
         )
         self._calendars = {idx: f"({idx}) {n}" for idx, n in calendars.items()}
-
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        self.iqtec_state = self.coordinator.data.rooms[self.idx]
-        _LOGGER.debug("Updating device: %s", self.idx)
-        self.async_write_ha_state()
+        self._deadband = coordinator.deadbands.get("Temperature")
+
+    def _controller_state(self) -> RoomState:
+        """Return the room state the controller reports."""
+        return self.coordinator.data.rooms[self.idx]
+
+    def _insignificant(
+        self, written: RoomState, state: RoomState, deadband: IqTecDeadband
+    ) -> bool:
+        """Return if only the measured temperature changed, within the deadband."""
+        measured = state.actual_temperature
+        return replace(written, actual_temperature=measured) == state and (
+            deadband.within(written.actual_temperature, measured)
+        )
 
     # @property
     # def supported_features(self) -> ClimateEntityFeature:
@@ -150,59 +209,34 @@ class IqTecClimate(IqTecEntity, ClimateEntity):
             return self.iqtec_state.requested_temperature
         return None
 
+    async def _async_send_calls(self, calls: dict[str, Any]) -> None:
+        """Send room setter calls as one batch and show their outcome."""
+        room = self._hub.rooms[self.idx]
+        await self._commands.async_send(
+            *(
+                IqTecCommand.unit_set(room, setter, value)
+                for setter, value in calls.items()
+            )
+        )
+        self._async_set_optimistic(
+            {SETTER_FIELDS[setter]: value for setter, value in calls.items()}
+        )
+
     async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
         """Set new target hvac mode."""
-        match hvac_mode:
-            case HVACMode.OFF:
-                self.hass.async_add_executor_job(
-                    self._hub.rooms[self.idx].set_room_mode, ROOM_MODES.OFF
-                )
-            case HVACMode.HEAT:
-                self.hass.async_add_executor_job(
-                    self._hub.rooms[self.idx].set_room_mode, ROOM_MODES.CALENDAR
-                )
-                self.hass.async_add_executor_job(
-                    self._hub.rooms[self.idx].set_correction_mode,
-                    ROOM_CORR_MODES.MANUAL,
-                )
-            case HVACMode.AUTO:
-                self.hass.async_add_executor_job(
-                    self._hub.rooms[self.idx].set_room_mode, ROOM_MODES.CALENDAR
-                )
-                self.hass.async_add_executor_job(
-                    self._hub.rooms[self.idx].set_correction_mode,
-                    ROOM_CORR_MODES.NONE,
-                )
+        if (calls := HVAC_MODE_CALLS.get(hvac_mode)) is not None:
+            await self._async_send_calls(calls)
 
     async def async_set_preset_mode(self, preset_mode: str) -> None:
         """Set new target preset mode."""
         cal_inv = {v: k for k, v in self._calendars.items()}
-        if preset_mode == PRESET_AWAY:
-            self.hass.async_add_executor_job(
-                self._hub.rooms[self.idx].set_room_mode, ROOM_MODES.HOLIDAY
-            )
-        elif preset_mode == PRESET_ANTIFREEZE:
-            self.hass.async_add_executor_job(
-                self._hub.rooms[self.idx].set_room_mode, ROOM_MODES.ANTIFREEZE
-            )
-        elif preset_mode == PRESET_NONE:
+        if preset_mode == PRESET_NONE:
             pass
+        elif (calls := PRESET_CALLS.get(preset_mode)) is not None:
+            await self._async_send_calls(calls)
         else:
-            self.hass.async_add_executor_job(
-                self._hub.rooms[self.idx].set_room_mode, ROOM_MODES.CALENDAR
-            )
-            self.hass.async_add_executor_job(
-                self._hub.rooms[self.idx].set_calendar, cal_inv[preset_mode]
-            )
+            await self._async_send_calls(calendar_calls(cal_inv[preset_mode]))
 
     async def async_set_temperature(self, **kwargs: Any) -> None:
         """Set new target temperature."""
-        temp = kwargs[ATTR_TEMPERATURE]
-        self.hass.async_add_executor_job(
-            self._hub.rooms[self.idx].set_correction_mode,
-            ROOM_CORR_MODES.MANUAL,
-        )
-        self.hass.async_add_executor_job(
-            self._hub.rooms[self.idx].set_correction_temperature,
-            temp,
-        )
+        await self._async_send_calls(temperature_calls(kwargs[ATTR_TEMPERATURE]))
@@ -0,0 +1,321 @@
+"""Command queue for IQtec controllers."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from functools import partial
+import logging
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+
+from piqtec.constants import (
+    MOVE_TIME_UNITS,
+    SUNBLIND_COMMANDS,
+    SUNBLIND_EXTENDED,
+    SUNBLIND_TILT_CLOSED,
+    TILT_TIME_OFFSET,
+)
+from piqtec.type_helpers import RequestSet, ResponseSet
+from piqtec.unit.sunblind import Sunblind
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import TIER_APIS, TIER_ROOMS, TIER_SUNBLINDS
+
+if TYPE_CHECKING:
+    from .api import IqTecApiClient
+    from .metrics import IqTecMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+# API each plain room and sunblind setter of piqtec writes
+SETTER_APIS = {
+    "set_room_mode": "room_mode",
+    "set_correction_mode": "correction_status",
+    "set_correction_time": "correction_time",
+    "set_correction_temperature": "correction_temperature",
+    "set_calendar": "calendar_number",
+    "set_command": "command",
+    "set_step_time": "step_time",
+}
+
+
+@dataclass(frozen=True)
+class IqTecCommand:
+    """A single write to the controller.
+
+    A piqtec request set the client sends itself. Staged commands first stop
+    their unit, then their request is built from the state it settled in.
+    """
+
+    request: RequestSet | None = field(default=None, hash=False)
+    stop: RequestSet | None = field(default=None, hash=False)
+    build: Callable[[ResponseSet], RequestSet] | None = None
+    tiers: tuple[str, ...] = ()
+    # (unit id, attribute), a newer command with the same key supersedes this one
+    key: tuple[str, str] | None = None
+    # Kind of unit written, the class name of rooms and sunblinds
+    unit_type: str = "api"
+    # Room or sunblind unit, or API ids written, refreshed after the command
+    unit: Any = field(default=None, compare=False, repr=False)
+    apis: tuple[str, ...] = ()
+
+    @classmethod
+    def unit_set(
+        cls,
+        unit: Any,
+        setter: str,
+        value: Any,
+        key: tuple[str, str] | None = None,
+    ) -> IqTecCommand:
+        """Create a command writing the API of a plain room or sunblind setter."""
+        return cls(
+            request=unit.apis[SETTER_APIS[setter]].set_request(str(value)),
+            tiers=(TIER_ROOMS, TIER_SUNBLINDS),
+            key=key,
+            unit_type=type(unit).__name__,
+            unit=unit,
+        )
+
+    @classmethod
+    def sunblind_move(
+        cls,
+        sunblind: Sunblind,
+        *,
+        position: int | None = None,
+        rotation: int | None = None,
+        key: tuple[str, str] | None = None,
+    ) -> IqTecCommand:
+        """Create a command moving a sunblind to a position or rotation.
+
+        Like the set_position and set_rotation of piqtec, the sunblind is
+        stopped and stepped from its settled state. Fully opening or closing
+        uses the UP and DOWN commands.
+        """
+        if position == 0:
+            return cls.unit_set(sunblind, "set_command", SUNBLIND_COMMANDS.UP, key)
+        if position == SUNBLIND_EXTENDED:
+            return cls.unit_set(sunblind, "set_command", SUNBLIND_COMMANDS.DOWN, key)
+        return cls(
+            stop=sunblind.apis["command"].set_request(str(SUNBLIND_COMMANDS.STOP)),
+            build=partial(
+                step_sunblind, sunblind, position=position, rotation=rotation
+            ),
+            tiers=(TIER_ROOMS, TIER_SUNBLINDS),
+            key=key,
+            unit_type=type(sunblind).__name__,
+            unit=sunblind,
+        )
+
+    @classmethod
+    def api_request(
+        cls, api: str, request: RequestSet, key: tuple[str, str] | None = None
+    ) -> IqTecCommand:
+        """Create a command from the set request of a raw API."""
+        return cls(request=request, tiers=(TIER_APIS,), key=key, apis=(api,))
+
+    @classmethod
+    def api_requests(cls, requests: Mapping[str, RequestSet]) -> IqTecCommand:
+        """Create a command from the set requests of several raw APIs."""
+        return cls(
+            request=sum(requests.values(), RequestSet()),
+            tiers=(TIER_APIS,),
+            apis=tuple(requests),
+        )
+
+
+def step_sunblind(
+    sunblind: Sunblind,
+    responses: ResponseSet,
+    *,
+    position: int | None = None,
+    rotation: int | None = None,
+) -> RequestSet:
+    """Return the request stepping a stopped sunblind to a position or rotation.
+
+    Step times are computed from the settled state as piqtec does.
+    """
+    state = sunblind.parse_state(responses)
+    if position is not None:
+        if state.position == position:
+            return RequestSet()
+        diff = float(position - state.position)
+        tilt_target = SUNBLIND_TILT_CLOSED if diff > 0 else 0
+        tilt_diff = float(tilt_target - state.rotation)
+        step_time = abs(
+            int(diff / SUNBLIND_EXTENDED * state.move_time * MOVE_TIME_UNITS)
+            + int(tilt_diff / SUNBLIND_TILT_CLOSED * state.full_time_time)
+        )
+    else:
+        if state.rotation == rotation:
+            return RequestSet()
+        diff = float(rotation - state.rotation)
+        step_time = abs(int(diff / SUNBLIND_TILT_CLOSED * state.full_time_time))
+    command = SUNBLIND_COMMANDS.STEP_DOWN if diff > 0 else SUNBLIND_COMMANDS.STEP_UP
+    return sunblind.apis["step_time"].set_request(
+        str(step_time + TILT_TIME_OFFSET)
+    ) + sunblind.apis["command"].set_request(str(command))
+
+
+class CommandFailed(HomeAssistantError):
+    """Error to indicate the controller did not accept a command."""
+
+
+class IqTecCommandQueue:
+    """Ordered command queue of a single controller.
+
+    Commands queued in the same event loop iteration are sent as one batch,
+    batches are sent one after another. A keyed command replaces any queued
+    command with the same key that has not been sent yet. A second staged
+    command of a unit waits for the next batch, so it starts from the state
+    the first one left.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: IqTecApiClient,
+        debounce_window: float,
+        metrics: IqTecMetrics,
+    ) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self._client = client
+        self._metrics = metrics
+        self._debounce_window = debounce_window
+        self._pending: list[tuple[IqTecCommand, asyncio.Future[bool]]] = []
+        self._debounced: dict[
+            tuple[str, str],
+            tuple[IqTecCommand, asyncio.Future[bool], asyncio.TimerHandle],
+        ] = {}
+        self._flush_task: asyncio.Task[None] | None = None
+        self._lock = asyncio.Lock()
+
+    async def async_send(self, *commands: IqTecCommand) -> None:
+        """Queue commands and wait until the controller acknowledged them."""
+        futures = []
+        for command in commands:
+            future = self.hass.loop.create_future()
+            self._enqueue(command, future)
+            futures.append(future)
+        await asyncio.gather(*futures)
+
+    async def async_send_latest(self, command: IqTecCommand) -> bool:
+        """Send a keyed command once its key was quiet for the debounce window.
+
+        Returns if the command was sent, not when a newer command superseded
+        it or it was discarded.
+        """
+        assert command.key is not None
+        future = self.hass.loop.create_future()
+        if self._debounce_window <= 0:
+            self._enqueue(command, future)
+            return await future
+        if (previous := self._debounced.pop(command.key, None)) is not None:
+            _, superseded, handle = previous
+            handle.cancel()
+            superseded.set_result(False)
+        handle = self.hass.loop.call_later(
+            self._debounce_window, self._release, command.key
+        )
+        self._debounced[command.key] = (command, future, handle)
+        return await future
+
+    @callback
+    def async_discard(self, unit: str) -> None:
+        """Drop all unsent keyed commands of a unit."""
+        for key in [k for k in self._debounced if k[0] == unit]:
+            _, future, handle = self._debounced.pop(key)
+            handle.cancel()
+            future.set_result(False)
+        self._drop_pending(lambda key: key[0] == unit)
+
+    @callback
+    def _release(self, key: tuple[str, str]) -> None:
+        """Queue a debounced command once its window passed."""
+        command, future, _ = self._debounced.pop(key)
+        self._enqueue(command, future)
+
+    @callback
+    def _drop_pending(self, match: Callable[[tuple[str, str]], bool]) -> None:
+        """Resolve and remove queued keyed commands matching the key filter."""
+        keep = []
+        for command, future in self._pending:
+            if command.key is not None and match(command.key):
+                if not future.done():
+                    future.set_result(False)
+            else:
+                keep.append((command, future))
+        self._pending = keep
+
+    @callback
+    def _enqueue(self, command: IqTecCommand, future: asyncio.Future[bool]) -> None:
+        """Add a command to the next batch."""
+        if command.key is not None:
+            self._drop_pending(lambda key: key == command.key)
+        self._pending.append((command, future))
+        self._schedule_flush()
+
+    @callback
+    def _schedule_flush(self) -> None:
+        """Send the queued commands, unless a flush is already scheduled."""
+        if self._flush_task is None:
+            self._flush_task = self.hass.async_create_background_task(
+                self._async_flush(), "iqtec command flush", eager_start=False
+            )
+
+    async def _async_flush(self) -> None:
+        """Send the commands queued so far as one batch.
+
+        Requests time out on their own, the lock is held until the whole
+        batch, staged commands included, is done.
+        """
+        async with self._lock:
+            batch, self._pending = _next_batch(self._pending)
+            self._flush_task = None
+            if self._pending:
+                self._schedule_flush()
+            if not batch:
+                return
+            _LOGGER.debug("Sending %s commands", len(batch))
+            unit_types = {c.unit_type for c, _ in batch}
+            start = monotonic()
+            try:
+                await self._client.async_execute([c for c, _ in batch])
+            except (ConnectionError, TimeoutError, CommandFailed) as err:
+                self._metrics.add_error("command", err)
+                error: Exception | None = CommandFailed(
+                    f"Failed to send command: {err}"
+                )
+            except Exception as err:
+                _LOGGER.exception("Unexpected error sending commands")
+                self._metrics.add_error("command", err)
+                error = CommandFailed(f"Unexpected error: {err}")
+            else:
+                error = None
+                elapsed = round((monotonic() - start) * 1000, 3)
+                for unit_type in unit_types:
+                    self._metrics.command_ms[unit_type].add(elapsed)
+            for _, future in batch:
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(True)
+                else:
+                    future.set_exception(error)
+
+
+def _next_batch[T](
+    pending: list[tuple[IqTecCommand, T]],
+) -> tuple[list[tuple[IqTecCommand, T]], list[tuple[IqTecCommand, T]]]:
+    """Split queued commands before the second staged command of a unit."""
+    staged: set[int] = set()
+    for i, (command, _) in enumerate(pending):
+        if command.build is not None:
+            if id(command.unit) in staged:
+                return pending[:i], pending[i:]
+            staged.add(id(command.unit))
+    return pending, []
@@ -5,15 +5,41 @@ from __future__ import annotations
 import logging
 from typing import Any
 
-from piqtec.controller import Controller
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
+from homeassistant.config_entries import (
+    ConfigEntry,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlowWithReload,
+)
 from homeassistant.const import CONF_HOST
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import DOMAIN
+from .const import (
+    CONF_API_INTERVAL,
+    CONF_CURATED_ATTRIBUTES,
+    CONF_DEADBAND_BYTE,
+    CONF_DEADBAND_FLOAT,
+    CONF_DEADBAND_SHORT,
+    CONF_DEADBAND_TEMPERATURE,
+    CONF_DEBOUNCE_WINDOW,
+    CONF_HEARTBEAT,
+    CONF_IDLE_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_RAW_ENTITIES,
+    CONF_ROOM_INTERVAL,
+    DEFAULT_API_INTERVAL,
+    DEFAULT_DEBOUNCE_WINDOW,
+    DEFAULT_HEARTBEAT,
+    DEFAULT_IDLE_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_ROOM_INTERVAL,
+    DOMAIN,
+)
+from .deadband import DEADBAND_OPTIONS, parse_deadband
+from .discovery import async_enumerate, async_hand_over
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,6 +50,36 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_MIN_INTERVAL, default=DEFAULT_MIN_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=0.2, max=5)
+        ),
+        vol.Optional(CONF_IDLE_INTERVAL, default=DEFAULT_IDLE_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=300)
+        ),
+        vol.Optional(CONF_ROOM_INTERVAL, default=DEFAULT_ROOM_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=600)
+        ),
+        vol.Optional(CONF_API_INTERVAL, default=DEFAULT_API_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=3600)
+        ),
+        vol.Optional(CONF_DEBOUNCE_WINDOW, default=DEFAULT_DEBOUNCE_WINDOW): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=5)
+        ),
+        vol.Optional(CONF_CURATED_ATTRIBUTES, default=False): bool,
+        vol.Optional(CONF_RAW_ENTITIES, default=True): bool,
+        # Absolute, or relative with a % suffix, 0 writes every change
+        vol.Optional(CONF_DEADBAND_TEMPERATURE, default="0"): str,
+        vol.Optional(CONF_DEADBAND_FLOAT, default="0"): str,
+        vol.Optional(CONF_DEADBAND_SHORT, default="0"): str,
+        vol.Optional(CONF_DEADBAND_BYTE, default="0"): str,
+        vol.Optional(CONF_HEARTBEAT, default=DEFAULT_HEARTBEAT): vol.All(
+            vol.Coerce(float), vol.Range(min=10, max=86400)
+        ),
+    }
+)
+
 
 # def _sb_section(idx: str):
 #     return vol.Schema(
@@ -45,12 +101,17 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     """
 
     try:
-        c = await hass.async_add_executor_job(Controller, data[CONF_HOST])
+        c = await async_enumerate(hass, data[CONF_HOST])
     except ConnectionError as err:
         raise CannotConnect(f"Got {err}") from None
 
     # Return info that you want to store in the config entry.
-    return {"url": data[CONF_HOST], "name": c.name, "sunblinds": c.sunblinds}
+    return {
+        "url": data[CONF_HOST],
+        "name": c.name,
+        "sunblinds": c.sunblinds,
+        "controller": c,
+    }
 
 
 class ConfigFlow(ConfigFlow, domain=DOMAIN):
@@ -61,6 +122,12 @@ class ConfigFlow(ConfigFlow, domain=DOMAIN):
     # _info: dict[str, str]
     # _user_data: dict[str, Any]
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> IqTecOptionsFlow:
+        """Return the options flow."""
+        return IqTecOptionsFlow()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
@@ -78,6 +145,8 @@ class ConfigFlow(ConfigFlow, domain=DOMAIN):
             else:
                 await self.async_set_unique_id(identifier)
                 self._abort_if_unique_id_configured()
+                # Set up with the enumerated controller instead of a new one
+                async_hand_over(self.hass, info["url"], info["controller"])
                 # self._info = info
                 # self._user_data = user_input
 
@@ -117,5 +186,33 @@ class ConfigFlow(ConfigFlow, domain=DOMAIN):
     #     )
 
 
+class IqTecOptionsFlow(OptionsFlowWithReload):
+    """Handle IQtec Smart Home options."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the polling options."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            for option in DEADBAND_OPTIONS.values():
+                try:
+                    parse_deadband(user_input[option])
+                except vol.Invalid:
+                    errors[option] = "invalid_deadband"
+            if user_input[CONF_MIN_INTERVAL] > user_input[CONF_IDLE_INTERVAL]:
+                errors["base"] = "invalid_intervals"
+            elif not errors:
+                return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                OPTIONS_SCHEMA, self.config_entry.options
+            ),
+            errors=errors,
+        )
+
+
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
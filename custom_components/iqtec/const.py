@@ -3,3 +3,62 @@
 DOMAIN = "iqtec"
 
 MANUAL_SWITCHES = ["SYSTEM.SET_HEAT"]
+
+API_PATH = "control/?"
+REQUEST_TIMEOUT = 10
+MAX_REQUESTS_PER_CALL = 64
+# Requests sent to a controller at the same time
+MAX_CONCURRENT_REQUESTS = 4
+# Longest request sent in one call, embedded HTTP servers limit the line length
+MAX_REQUEST_LENGTH = 2000
+
+CONF_MIN_INTERVAL = "min_interval"
+CONF_IDLE_INTERVAL = "idle_interval"
+CONF_ROOM_INTERVAL = "room_interval"
+CONF_API_INTERVAL = "api_interval"
+CONF_DEBOUNCE_WINDOW = "debounce_window"
+CONF_CURATED_ATTRIBUTES = "curated_attributes"
+CONF_DEADBAND_TEMPERATURE = "deadband_temperature"
+CONF_DEADBAND_FLOAT = "deadband_float"
+CONF_DEADBAND_SHORT = "deadband_short"
+CONF_DEADBAND_BYTE = "deadband_byte"
+CONF_HEARTBEAT = "heartbeat"
+CONF_RAW_ENTITIES = "raw_entities"
+
+DEFAULT_MIN_INTERVAL = 0.5
+DEFAULT_INTERVAL = 2.0
+DEFAULT_IDLE_INTERVAL = 10.0
+DEFAULT_ROOM_INTERVAL = 10.0
+DEFAULT_API_INTERVAL = 60.0
+DEFAULT_DEBOUNCE_WINDOW = 0.3
+# Seconds a value held back by a deadband may go unwritten
+DEFAULT_HEARTBEAT = 600.0
+
+# Seconds of fast polling after a command
+FAST_POLL_WINDOW = 10
+# Seconds without any change before the interval starts to back off
+IDLE_BACKOFF_AFTER = 30
+IDLE_BACKOFF_FACTOR = 1.5
+
+# Seconds a commanded value is shown before the controller has to report it
+OPTIMISTIC_TIMEOUT = 15
+
+# Seconds a sunblind takes for its whole travel, when its move_time is not set
+COVER_TRAVEL_TIME = 60
+# Seconds between position estimates of a moving sunblind
+COVER_ESTIMATE_INTERVAL = 0.5
+# Seconds between reads while waiting for moved sunblinds to stop
+COVER_SETTLE_INTERVAL = 1.0
+
+# Exponential backoff on repeated connection errors, with +-20 % jitter
+ERROR_BACKOFF_BASE = 2.0
+ERROR_BACKOFF_MAX = 120.0
+ERROR_BACKOFF_JITTER = 0.2
+
+# Status tiers, refreshed at their own rates
+TIER_ROOMS = "rooms"
+TIER_SUNBLINDS = "sunblinds"
+TIER_APIS = "apis"
+
+# Samples kept by each rolling statistic of the diagnostics
+METRICS_WINDOW = 500
@@ -1,18 +1,58 @@
 """DataUpdate Coordinator for IQtec platform."""
 
 import asyncio
-from dataclasses import dataclass
+from collections import Counter
+from collections.abc import Iterable, Sequence
+import contextlib
+from dataclasses import dataclass, field
 from datetime import timedelta
 import logging
+import random
+from time import monotonic
+from typing import Any
 
 from piqtec.controller import Controller
+from piqtec.unit.sunblind import SunblindState
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import DOMAIN
+from .api import IqTecApiClient, IqTecApiValues, IqTecStatus
+from .commands import IqTecCommand, IqTecCommandQueue
+from .const import (
+    CONF_API_INTERVAL,
+    CONF_DEBOUNCE_WINDOW,
+    CONF_IDLE_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_RAW_ENTITIES,
+    CONF_ROOM_INTERVAL,
+    DEFAULT_API_INTERVAL,
+    DEFAULT_DEBOUNCE_WINDOW,
+    DEFAULT_IDLE_INTERVAL,
+    DEFAULT_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_ROOM_INTERVAL,
+    DOMAIN,
+    ERROR_BACKOFF_BASE,
+    ERROR_BACKOFF_JITTER,
+    ERROR_BACKOFF_MAX,
+    FAST_POLL_WINDOW,
+    IDLE_BACKOFF_AFTER,
+    IDLE_BACKOFF_FACTOR,
+    REQUEST_TIMEOUT,
+    TIER_APIS,
+    TIER_ROOMS,
+    TIER_SUNBLINDS,
+)
+from .deadband import IqTecDeadband
+from .discovery import IqTecTopology
+from .index import IqTecEntityIndex
+from .metrics import IqTecMetrics
+from .profiler import IqTecProfiler
+from .replay import IqTecRecorder
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,7 +61,7 @@ _LOGGER = logging.getLogger(__name__)
 class IQTecData:
     """Runtime dataclass."""
 
-    coordinator: DataUpdateCoordinator
+    coordinator: "IqTecCoordinator"
     cover_use_short_tilt: bool
     # cover_config: dict[str, Any]
 
@@ -29,47 +69,527 @@ class IQTecData:
 type IqTecConfigEntry = ConfigEntry[IQTecData]
 
 
-class IqTecCoordinator(DataUpdateCoordinator):
+@dataclass
+class _Tier:
+    """Part of the status refreshed at its own rate."""
+
+    name: str
+    # Seconds between refreshes, 0 refreshes on every poll
+    interval: float
+    next_due: float = 0.0
+    failures: int = 0
+    last_error: Exception | None = field(default=None, repr=False)
+
+
+def backoff_delay(failures: int) -> float:
+    """Return the retry delay after consecutive failures."""
+    delay = min(ERROR_BACKOFF_BASE * 2 ** (failures - 1), ERROR_BACKOFF_MAX)
+    return delay * random.uniform(1 - ERROR_BACKOFF_JITTER, 1 + ERROR_BACKOFF_JITTER)
+
+
+def _is_moving(sunblind: SunblindState) -> bool:
+    return (
+        sunblind.out_up_1 or sunblind.out_up_2 or sunblind.out_dn_1 or sunblind.out_dn_2
+    )
+
+
+class IqTecCoordinator(DataUpdateCoordinator[IqTecStatus]):
     """IQtec coordinator."""
 
-    hub: Controller
+    client: IqTecApiClient
+    commands: IqTecCommandQueue
     hass: HomeAssistant
+    topology: IqTecTopology
+    index: IqTecEntityIndex
 
     def __init__(
-        self, hass: HomeAssistant, config_entry: IqTecConfigEntry, hub: Controller
+        self,
+        hass: HomeAssistant,
+        config_entry: IqTecConfigEntry,
+        client: IqTecApiClient,
     ) -> None:
         """Initialize IQtec coordinator."""
+        self._min_interval = config_entry.options.get(
+            CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL
+        )
+        self._idle_interval = config_entry.options.get(
+            CONF_IDLE_INTERVAL, DEFAULT_IDLE_INTERVAL
+        )
+        self._active_interval = min(
+            max(DEFAULT_INTERVAL, self._min_interval), self._idle_interval
+        )
         super().__init__(
             hass,
             _LOGGER,
             name=f"{DOMAIN} ({config_entry.unique_id})",
             config_entry=config_entry,
-            update_interval=timedelta(seconds=2),
+            update_interval=timedelta(seconds=self._active_interval),
             always_update=True,
         )
-        self.hub = hub
+        self.client = client
+        self.metrics = IqTecMetrics()
+        self.commands = IqTecCommandQueue(
+            hass,
+            client,
+            config_entry.options.get(CONF_DEBOUNCE_WINDOW, DEFAULT_DEBOUNCE_WINDOW),
+            self.metrics,
+        )
         self.hass = hass
+        self.index = IqTecEntityIndex()
+        self.deadbands = IqTecDeadband.from_options(config_entry.options)
+        self.raw_entities: bool = config_entry.options.get(CONF_RAW_ENTITIES, True)
+        self._changed: set[str] | None = None
+        self.notified_count = 0
+        self.skipped_count = 0
+        self._fast_until = 0.0
+        self._last_change = monotonic()
+        self._failures = 0
+        self.overruns = 0
+        self.skipped_polls = 0
+        # Set while a refresh runs, refreshes requested meanwhile join it
+        self._refreshing: asyncio.Future[None] | None = None
+        self.profiler: IqTecProfiler | None = None
+        # Units and APIs written by commands, refreshed together
+        self._refresh_units: dict[int, Any] = {}
+        self._refresh_apis: set[str] = set()
+        self._refresh_task: asyncio.Task[None] | None = None
+        # Unit or API id -> when its targeted refresh was requested
+        self._refreshed: dict[str, float] = {}
+        # API id -> subscribers, only these APIs are fetched and decoded
+        self._api_subscribers: Counter[str] = Counter()
+        self._tiers = {
+            TIER_ROOMS: _Tier(
+                TIER_ROOMS,
+                config_entry.options.get(CONF_ROOM_INTERVAL, DEFAULT_ROOM_INTERVAL),
+            ),
+            TIER_SUNBLINDS: _Tier(TIER_SUNBLINDS, 0),
+            TIER_APIS: _Tier(
+                TIER_APIS,
+                config_entry.options.get(CONF_API_INTERVAL, DEFAULT_API_INTERVAL),
+            ),
+        }
+        client.async_add_command_listener(self.async_note_command)
+        # Without a controller there is nothing to poll yet
+        if not client.ready:
+            self.update_interval = None
 
-    async def _async_setup(self):
-        """Set up the coordinator.
+    @property
+    def hub(self) -> Controller | None:
+        """Return the controller, once discovered."""
+        return self.client.hub
 
-        Test the connection to the IQtec controller
+    @property
+    def tiers(self) -> list[_Tier]:
+        """Return the status tiers."""
+        return list(self._tiers.values())
+
+    @property
+    def subscribed_apis(self) -> list[str]:
+        """Return the APIs that are fetched, in subscription order."""
+        return list(self._api_subscribers)
+
+    @callback
+    def async_subscribe_apis(self, apis: Iterable[str]) -> CALLBACK_TYPE:
+        """Fetch APIs until the returned callback is called.
+
+        APIs without a value in the snapshot yet are fetched right away.
         """
+        apis = list(apis)
+        new = [idx for idx in apis if not self._api_subscribers[idx]]
+        self._api_subscribers.update(apis)
+        if new and self.data is not None:
+            self._async_refresh_apis(new)
+
+        @callback
+        def _async_unsubscribe() -> None:
+            self._api_subscribers.subtract(apis)
+            for idx in apis:
+                if self._api_subscribers[idx] <= 0:
+                    del self._api_subscribers[idx]
+
+        return _async_unsubscribe
+
+    @callback
+    def api_values(
+        self, apis: Iterable[str], status: IqTecStatus | None = None
+    ) -> dict[str, Any]:
+        """Return typed API values of a snapshot, None for unknown values."""
+        values = (status or self.data or IqTecStatus()).api_values
+        entries = self.index.apis
+        return {idx: entries[idx].decode(values) for idx in apis}
+
+    async def async_read_apis(self, apis: Sequence[str]) -> dict[str, Any]:
+        """Return typed API values, fetching those missing from the snapshot."""
+        if (data := self.data) is None:
+            raise HomeAssistantError("Controller status has not been fetched yet")
+        if missing := [idx for idx in apis if idx not in data.apis]:
+            try:
+                async with asyncio.timeout(REQUEST_TIMEOUT):
+                    status = await self.client.async_fetch(apis=True, api_ids=missing)
+            except (ConnectionError, TimeoutError) as err:
+                raise HomeAssistantError(f"Reading APIs failed: {err}") from err
+            data = data.merge(status, self.index.slots)
+        return self.api_values(apis, data)
+
+    @callback
+    def async_set_topology(self, topology: IqTecTopology) -> None:
+        """Set the topology the entities are created from and index its APIs."""
+        self.topology = topology
+        self.index = IqTecEntityIndex.from_topology(topology, self.raw_entities)
+        if self.data is not None:
+            self.data.api_values = IqTecApiValues.decode(
+                self.index.slots, self.data.apis
+            )
+
+    @callback
+    def async_start_recording(self, path: str) -> None:
+        """Record the controller traffic to a file.
+
+        The recording starts with the current snapshot, so it holds every
+        unit even when its tier is not due for a while.
+        """
+        if self.client.recorder is not None:
+            raise HomeAssistantError("Already recording")
+        self.client.recorder = IqTecRecorder(self.hass, path, self.topology)
+        if self.data is not None:
+            self.client.recorder.record_status(self.data, list(self._tiers))
+
+    async def async_stop_recording(self) -> IqTecRecorder | None:
+        """Stop recording and write the remaining records."""
+        if (recorder := self.client.recorder) is None:
+            return None
+        self.client.recorder = None
+        await recorder.async_close()
+        return recorder
+
+    async def async_profile(self, path: str, cycles: int) -> dict[str, Any]:
+        """Profile the next update cycles, return a summary of them.
+
+        Waits at most the idle interval plus a request timeout per cycle.
+        """
+        if self.hub is None:
+            raise HomeAssistantError("Controller has not been discovered yet")
+        if self.profiler is not None:
+            raise HomeAssistantError("Already profiling")
+        self.profiler = profiler = IqTecProfiler(cycles)
         try:
-            async with asyncio.timeout(10):
-                await self.hass.async_add_executor_job(self.hub.update_status)
-        except ConnectionError as e:
-            raise ConfigEntryAuthFailed(
-                f"Failed to connect to the Controller: {e}"
+            async with asyncio.timeout(
+                cycles * (self._idle_interval + REQUEST_TIMEOUT)
+            ):
+                await profiler.done
+        except TimeoutError:
+            raise HomeAssistantError(
+                f"Profiled only {profiler.completed} of {cycles} update cycles"
             ) from None
+        finally:
+            self.profiler = None
+        return await profiler.async_write(self.hass, path)
+
+    async def async_shutdown(self) -> None:
+        """Stop polling and profiling."""
+        if self.profiler is not None:
+            self.profiler.done.cancel()
+        await super().async_shutdown()
+
+    def _phase(self, name: str) -> contextlib.AbstractContextManager[None]:
+        """Time a phase of the update cycle while profiling."""
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.phase(name)
+
+    async def async_attach(self, hub: Controller) -> None:
+        """Start polling a controller discovered in the background."""
+        self.client.attach(hub)
+        self.update_interval = timedelta(seconds=self._active_interval)
+        await self.async_refresh()
 
     async def _async_update_data(self):
         """Fetch data from API endpoint.
 
-        Fetch the status data from IQtec
+        Refresh the status tiers that are due, one after another, and merge
+        them into the current snapshot. A failing tier keeps its previous
+        values, the update only fails when nothing could be refreshed. Units
+        and APIs a targeted refresh fetched after this poll started keep
+        their newer values.
+
+        Repeated failures back off exponentially.
+        """
+        now = monotonic()
+        due = [
+            t for t in self._tiers.values() if self.data is None or now >= t.next_due
+        ]
+        results: list[IqTecStatus | Exception] = []
+        with self._phase("fetch"):
+            for tier in due:
+                try:
+                    results.append(await self._async_fetch_tier(tier))
+                except (ConnectionError, TimeoutError) as err:
+                    results.append(err)
+
+        # Targeted refreshes may have updated the snapshot in the meantime
+        previous = self.data or IqTecStatus()
+        tables = {
+            TIER_ROOMS: previous.rooms,
+            TIER_SUNBLINDS: previous.sunblinds,
+            TIER_APIS: previous.apis,
+        }
+        failed = []
+        for tier, result in zip(due, results, strict=True):
+            if isinstance(result, Exception):
+                if not tier.failures:
+                    _LOGGER.warning("Refreshing %s failed: %s", tier.name, result)
+                self.metrics.add_error(f"fetch_{tier.name}", result)
+                tier.failures += 1
+                tier.last_error = result
+                failed.append(tier)
+            else:
+                if tier.failures:
+                    _LOGGER.info("Refreshing %s recovered", tier.name)
+                tier.failures = 0
+                tier.next_due = now + tier.interval
+                tables[tier.name] = self._keep_refreshed(
+                    getattr(result, tier.name), getattr(previous, tier.name), now
+                )
+
+        if failed and (self.data is None or len(failed) == len(due)):
+            self._failures += 1
+            raise UpdateFailed(
+                f"Error communicating with API: {failed[0].last_error}",
+                retry_after=backoff_delay(self._failures),
+            ) from None
+        self._failures = 0
+        for tier in failed:
+            tier.next_due = now + backoff_delay(tier.failures)
+        self._refreshed = {idx: t for idx, t in self._refreshed.items() if t > now}
+        if monotonic() - now > self.update_interval.total_seconds():
+            self.overruns += 1
+
+        with self._phase("decode"):
+            if tables[TIER_APIS] is previous.apis:
+                api_values = previous.api_values
+            else:
+                api_values = IqTecApiValues.decode(self.index.slots, tables[TIER_APIS])
+            data = IqTecStatus(**tables, api_values=api_values)
+            # Entities only need the diff while availability is unchanged
+            if self.data is not None and self.last_update_success:
+                self._changed = data.changed(self.data)
+                self.metrics.changed_values.add(len(self._changed))
+        self.metrics.snapshot_size.add(
+            len(data.rooms) + len(data.sunblinds) + len(data.apis)
+        )
+        if self.client.recorder is not None:
+            self.client.recorder.record_status(
+                data, [t.name for t in due if t not in failed]
+            )
+        self._adapt_interval(data, self._changed is None or bool(self._changed))
+        return data
+
+    def _keep_refreshed(
+        self, table: dict[str, Any], current: dict[str, Any], since: float
+    ) -> dict[str, Any]:
+        """Return a fetched table with the values refreshed after a time."""
+        newer = {
+            idx: current[idx]
+            for idx, refreshed in self._refreshed.items()
+            if refreshed > since and idx in current
+        }
+        return {**table, **newer} if newer else table
+
+    async def _async_fetch_tier(self, tier: _Tier) -> IqTecStatus:
+        """Fetch a single status tier."""
+        start = monotonic()
+        async with asyncio.timeout(REQUEST_TIMEOUT):
+            status = await self.client.async_fetch(
+                **{tier.name: True}, api_ids=self.subscribed_apis
+            )
+        self.metrics.fetch_ms[tier.name].add(round((monotonic() - start) * 1000, 3))
+        return status
+
+    def _adapt_interval(self, data: IqTecStatus, changed: bool) -> None:
+        """Pick the next poll interval from the recent activity.
+
+        Polls fast after a command and while a sunblind moves, then backs off
+        gradually towards the idle interval once nothing has changed for a while.
+        """
+        now = monotonic()
+        if changed:
+            self._last_change = now
+        if now < self._fast_until or any(map(_is_moving, data.sunblinds.values())):
+            interval = self._min_interval
+        elif now - self._last_change < IDLE_BACKOFF_AFTER:
+            interval = self._active_interval
+        else:
+            interval = min(
+                self.update_interval.total_seconds() * IDLE_BACKOFF_FACTOR,
+                self._idle_interval,
+            )
+        self.update_interval = timedelta(seconds=interval)
+
+    @callback
+    def async_note_command(
+        self, *tiers: str, commands: Sequence[IqTecCommand] = ()
+    ) -> None:
+        """Switch to fast polling after a command was sent.
+
+        The units and APIs the commands wrote are refreshed right away.
+        Commands without them, like replayed ones, leave the affected tiers
+        to the next poll.
+        """
+        self._fast_until = monotonic() + FAST_POLL_WINDOW
+        if not self._async_refresh_targets(commands):
+            self.async_mark_due(*tiers)
+        self.update_interval = timedelta(seconds=self._min_interval)
+        # A refresh in progress schedules the next one on its own
+        if self._unsub_refresh is not None:
+            self._schedule_refresh()
+
+    @callback
+    def async_mark_due(self, *tiers: str) -> None:
+        """Refresh status tiers on the next poll, whatever their interval."""
+        for tier in tiers:
+            self._tiers[tier].next_due = 0.0
+
+    @callback
+    def _async_refresh_targets(self, commands: Sequence[IqTecCommand]) -> bool:
+        """Queue a refresh of the units and APIs commands wrote.
+
+        Returns False when some command cannot be refreshed on its own.
         """
+        if (
+            not commands
+            or self.data is None
+            or any(c.unit is None and not c.apis for c in commands)
+        ):
+            return False
+        for command in commands:
+            if command.unit is not None:
+                self._refresh_units[id(command.unit)] = command.unit
+            self._refresh_apis.update(command.apis)
+        self._async_start_refresh()
+        return True
+
+    @callback
+    def _async_refresh_apis(self, apis: Sequence[str]) -> None:
+        """Queue a refresh of newly subscribed APIs."""
+        self._refresh_apis.update(apis)
+        self._async_start_refresh()
+
+    @callback
+    def _async_start_refresh(self) -> None:
+        """Start refreshing the queued units and APIs, unless already started."""
+        if self._refresh_task is None:
+            # Started in a later iteration, later commands and subscriptions join it
+            self._refresh_task = self.config_entry.async_create_background_task(
+                self.hass,
+                self._async_refresh_units(),
+                "iqtec unit refresh",
+                eager_start=False,
+            )
+
+    async def _async_refresh_units(self) -> None:
+        """Fetch the queued units and APIs and merge them into the snapshot."""
+        units, self._refresh_units = list(self._refresh_units.values()), {}
+        apis, self._refresh_apis = list(self._refresh_apis), set()
+        self._refresh_task = None
+        start = monotonic()
+        try:
+            async with asyncio.timeout(REQUEST_TIMEOUT):
+                status = await self.client.async_fetch_units(units, apis)
+        except (ConnectionError, TimeoutError) as err:
+            _LOGGER.debug("Refreshing commanded units failed: %s", err)
+            self.metrics.add_error("fetch_units", err)
+            # Left to the next poll
+            if units:
+                self.async_mark_due(TIER_ROOMS, TIER_SUNBLINDS)
+            if apis:
+                self.async_mark_due(TIER_APIS)
+            return
+        if (previous := self.data) is None:
+            return
+        data = previous.merge(status, self.index.slots)
+        for table in (status.rooms, status.sunblinds, status.apis):
+            self._refreshed.update(dict.fromkeys(table, start))
+        if self.client.recorder is not None:
+            self.client.recorder.record_status(
+                data, [name for name in self._tiers if getattr(status, name)]
+            )
+        # Entities only need the diff while availability is unchanged
+        if self.last_update_success:
+            self._changed = data.changed(previous)
+        self.async_set_updated_data(data)
+
+    async def async_refresh(self) -> None:
+        """Refresh data, joining a refresh that is already running.
+
+        Joined refreshes are counted as skipped polls.
+        """
+        if self._refreshing is not None:
+            self.skipped_polls += 1
+            await asyncio.shield(self._refreshing)
+            return
+        await super().async_refresh()
+
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh data, profiled while a profile is requested."""
+        self._refreshing = refreshing = self.hass.loop.create_future()
         try:
-            async with asyncio.timeout(10):
-                return await self.hass.async_add_executor_job(self.hub.update_status)
-        except ConnectionError as err:
-            raise UpdateFailed(f"Error communicating with API: {err}") from None
+            if self.profiler is None:
+                await super()._async_refresh(*args, **kwargs)
+                return
+            with self.profiler.cycle():
+                await super()._async_refresh(*args, **kwargs)
+        finally:
+            self._refreshing = None
+            refreshing.set_result(None)
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Schedule a refresh.
+
+        The base scheduler rounds to whole seconds, which would turn
+        sub-second intervals into bursts of back-to-back polls.
+        """
+        interval = self._update_interval_seconds
+        if interval is None or interval >= 1 or self._retry_after is not None:
+            super()._schedule_refresh()
+            return
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+        self._async_unsub_refresh()
+        self._unsub_refresh = async_call_later(
+            self.hass, interval, self._handle_refresh_interval
+        )
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update listeners whose underlying values changed.
+
+        Listeners registered without a context are always updated.
+        """
+        changed, self._changed = self._changed, None
+        listeners = len(self._listeners)
+        if self.data is None:
+            # Entities have nothing to show before the first successful refresh
+            changed = set()
+        if changed is None and self.profiler is None:
+            notified = listeners
+            super().async_update_listeners()
+        else:
+            notified = 0
+            with self._phase("dispatch"):
+                for update_callback, context in list(self._listeners.values()):
+                    if changed is None or context is None or context in changed:
+                        if self.profiler is None:
+                            update_callback()
+                        else:
+                            self.profiler.call_listener(update_callback, context)
+                        notified += 1
+        self.notified_count = notified
+        self.skipped_count = listeners - notified
+        self.metrics.notified_entities.add(notified)
+        _LOGGER.debug(
+            "Updated %s of %s entities, %s values changed",
+            notified,
+            listeners,
+            "all" if changed is None else len(changed),
+        )
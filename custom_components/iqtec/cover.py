@@ -1,6 +1,8 @@
 """IQtec Covers."""
 
+from datetime import datetime, timedelta
 import logging
+from time import monotonic
 from typing import Any
 
 from piqtec.constants import SUNBLIND_COMMANDS, SUNBLIND_EXTENDED, SUNBLIND_TILT_CLOSED
@@ -13,17 +15,38 @@ from homeassistant.components.cover import (
     CoverEntity,
     CoverEntityFeature,
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
 
-from .const import DOMAIN
+from .commands import IqTecCommand
+from .const import COVER_ESTIMATE_INTERVAL, DOMAIN
 from .coordinator import IqTecConfigEntry, IqTecCoordinator
 from .entity import IqTecEntity
+from .motion import IqTecCoverMotion, direction
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def sunblind_position(position: int) -> int:
+    """Convert a cover position in percent to a sunblind position."""
+    return int(float(100 - position) * SUNBLIND_EXTENDED / 100)
+
+
+def sunblind_rotation(tilt_position: int) -> int:
+    """Convert a cover tilt position in percent to a sunblind rotation."""
+    return int(float(100 - tilt_position) * SUNBLIND_TILT_CLOSED / 100)
+
+
+def _is_opening(state: SunblindState) -> bool:
+    return direction(state) < 0
+
+
+def _is_closing(state: SunblindState) -> bool:
+    return direction(state) > 0
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: IqTecConfigEntry,
@@ -32,8 +55,10 @@ async def async_setup_entry(
     """Setup Cover entries."""
     coordinator = config_entry.runtime_data.coordinator
     short_tilt = config_entry.runtime_data.cover_use_short_tilt
+    topology = coordinator.topology
     async_add_entities(
-        IqTecCover(coordinator, idx, short_tilt) for idx in coordinator.hub.sunblinds
+        IqTecCover(coordinator, idx, name, idx in topology.tilt_sunblinds, short_tilt)
+        for idx, name in topology.sunblinds.items()
     )
 
 
@@ -51,15 +76,26 @@ class IqTecCover(IqTecEntity, CoverEntity):
 
     device_class = CoverDeviceClass.BLIND
 
+    _curated_attributes = ("position", "rotation")
+
     def __init__(
-        self, coordinator: IqTecCoordinator, idx: str, short_tilt: bool
+        self,
+        coordinator: IqTecCoordinator,
+        idx: str,
+        name: str,
+        tilt: bool,
+        short_tilt: bool,
     ) -> None:
         """Initialise IQtec Cover."""
         super().__init__(coordinator, idx)
+        self._attr_name = name
         self._short_tilt = short_tilt
-        self.iqtec_state = coordinator.data.sunblinds[self.idx]
+        self._motion = IqTecCoverMotion()
+        # Position and rotation estimated while moving
+        self._estimate: tuple[int, int] | None = None
+        self._unsub_estimate: CALLBACK_TYPE | None = None
 
-        if self.iqtec_state.full_time_time > 0:
+        if tilt:
             self.supported_features = (
                 self.supported_features
                 | CoverEntityFeature.OPEN_TILT
@@ -73,12 +109,67 @@ class IqTecCover(IqTecEntity, CoverEntity):
             identifiers={(DOMAIN, room_id)},
         )
 
+    def _controller_state(self) -> SunblindState:
+        """Return the sunblind state the controller reports."""
+        return self.coordinator.data.sunblinds[self.idx]
+
+    def _show_state(self, state: SunblindState) -> None:
+        """Show a state, estimating the position between polls while moving."""
+        super()._show_state(state)
+        self._motion.update(state, monotonic())
+        self._estimate = None
+        if not direction(state):
+            self._async_stop_estimate()
+        elif self._unsub_estimate is None:
+            self._unsub_estimate = async_track_time_interval(
+                self.hass,
+                self._async_estimate,
+                timedelta(seconds=COVER_ESTIMATE_INTERVAL),
+                name=f"iqtec {self.idx} position estimate",
+            )
+
+    @callback
+    def _async_estimate(self, _: datetime) -> None:
+        """Show the estimated position of the moving sunblind."""
+        estimate = self._motion.estimate(monotonic())
+        if estimate != self._estimate:
+            self._estimate = estimate
+            self.async_write_ha_state()
+
     @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        self.iqtec_state = self.coordinator.data.sunblinds[self.idx]
-        _LOGGER.debug("Updating device: %s", self.idx)
-        self.async_write_ha_state()
+    def _async_stop_estimate(self) -> None:
+        if self._unsub_estimate is not None:
+            self._unsub_estimate()
+            self._unsub_estimate = None
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop estimating the position."""
+        self._async_stop_estimate()
+        await super().async_will_remove_from_hass()
+
+    @callback
+    def _async_set_moving(self, target: int) -> None:
+        """Show the sunblind moving towards a position until it is reported.
+
+        Short moves may be over before the next poll, reaching the target
+        confirms them as well.
+        """
+        position = self._controller_state().position
+        if target == position:
+            return
+        up = target < position
+        self._async_set_optimistic(
+            {"out_up_1": up, "out_up_2": False, "out_dn_1": not up, "out_dn_2": False},
+            lambda state: (
+                state.position == target
+                or (_is_opening(state) if up else _is_closing(state))
+            ),
+        )
+
+    @property
+    def _sunblind(self) -> Any:
+        """Return the piqtec sunblind unit."""
+        return self._hub.sunblinds[self.idx]
 
     @property
     def is_closed(self) -> bool:
@@ -88,67 +179,79 @@ class IqTecCover(IqTecEntity, CoverEntity):
     @property
     def current_cover_position(self) -> int:
         """Return cover position."""
-        return int(
-            float(SUNBLIND_EXTENDED - self.iqtec_state.position)
-            * 100
-            / SUNBLIND_EXTENDED
-        )
+        position = self.iqtec_state.position
+        if self._estimate is not None:
+            position = self._estimate[0]
+        return int(float(SUNBLIND_EXTENDED - position) * 100 / SUNBLIND_EXTENDED)
 
     @property
     def current_cover_tilt_position(self) -> int:
         """Return tilt position."""
-        return int(
-            float(SUNBLIND_TILT_CLOSED - self.iqtec_state.rotation)
-            * 100
-            / SUNBLIND_TILT_CLOSED
-        )
+        rotation = self.iqtec_state.rotation
+        if self._estimate is not None:
+            rotation = self._estimate[1]
+        return int(float(SUNBLIND_TILT_CLOSED - rotation) * 100 / SUNBLIND_TILT_CLOSED)
 
     @property
     def is_closing(self) -> bool:
         """Return cover closing."""
-        return self.iqtec_state.out_dn_1 or self.iqtec_state.out_dn_2
+        return _is_closing(self.iqtec_state)
 
     @property
     def is_opening(self) -> bool:
         """Return cover closing."""
-        return self.iqtec_state.out_up_1 or self.iqtec_state.out_up_2
+        return _is_opening(self.iqtec_state)
 
     async def async_open_cover(self, **kwargs: Any) -> None:
         """Open the cover."""
-        self.hass.async_add_executor_job(
-            self._hub.sunblinds[self.idx].set_command, SUNBLIND_COMMANDS.UP
+        self._commands.async_discard(self.idx)
+        await self._commands.async_send(
+            IqTecCommand.unit_set(self._sunblind, "set_command", SUNBLIND_COMMANDS.UP)
         )
+        self._async_set_moving(0)
 
     async def async_close_cover(self, **kwargs: Any) -> None:
         """Close cover."""
-        self.hass.async_add_executor_job(
-            self._hub.sunblinds[self.idx].set_command, SUNBLIND_COMMANDS.DOWN
+        self._commands.async_discard(self.idx)
+        await self._commands.async_send(
+            IqTecCommand.unit_set(self._sunblind, "set_command", SUNBLIND_COMMANDS.DOWN)
         )
+        self._async_set_moving(SUNBLIND_EXTENDED)
 
     async def async_stop_cover(self, **kwargs: Any) -> None:
         """Stop the cover."""
-        self.hass.async_add_executor_job(
-            self._hub.sunblinds[self.idx].set_command, SUNBLIND_COMMANDS.STOP
+        self._commands.async_discard(self.idx)
+        await self._commands.async_send(
+            IqTecCommand.unit_set(self._sunblind, "set_command", SUNBLIND_COMMANDS.STOP)
+        )
+        self._async_set_optimistic(
+            {"out_up_1": False, "out_up_2": False, "out_dn_1": False, "out_dn_2": False}
         )
 
     async def async_set_cover_position(self, **kwargs: Any) -> None:
         """Move the cover to a specific position."""
-        position = kwargs[ATTR_POSITION]
-        pos = int(float(100 - position) * SUNBLIND_EXTENDED / 100)
-        self.hass.async_add_executor_job(
-            self._hub.sunblinds[self.idx].set_position, pos
-        )
+        pos = sunblind_position(kwargs[ATTR_POSITION])
+        if await self._commands.async_send_latest(
+            IqTecCommand.sunblind_move(
+                self._sunblind, position=pos, key=(self.idx, "position")
+            )
+        ):
+            self._async_set_moving(pos)
 
     async def async_open_cover_tilt(self, **kwargs: Any) -> None:
         """Open the cover tilt."""
+        self._commands.async_discard(self.idx)
         if self._short_tilt:
-            self.hass.async_add_executor_job(
-                self._hub.sunblinds[self.idx].set_command,
-                SUNBLIND_COMMANDS.TILT_OPEN_SHORT,
+            await self._commands.async_send(
+                IqTecCommand.unit_set(
+                    self._sunblind, "set_command", SUNBLIND_COMMANDS.TILT_OPEN_SHORT
+                )
             )
         else:
-            self.hass.async_add_executor_job(
-                self._hub.sunblinds[self.idx].set_command, SUNBLIND_COMMANDS.TILT_OPEN
+            await self._commands.async_send(
+                IqTecCommand.unit_set(
+                    self._sunblind, "set_command", SUNBLIND_COMMANDS.TILT_OPEN
+                )
             )
 
     async def async_close_cover_tilt(self, **kwargs: Any) -> None:
@@ -161,8 +264,9 @@ class IqTecCover(IqTecEntity, CoverEntity):
 
     async def async_set_cover_tilt_position(self, **kwargs: Any) -> None:
         """Move the cover tilt to a specific position."""
-        tilt = kwargs[ATTR_TILT_POSITION]
-        rotation = int(float(100 - tilt) * SUNBLIND_TILT_CLOSED / 100)
-        self.hass.async_add_executor_job(
-            self._hub.sunblinds[self.idx].set_rotation, rotation
+        rotation = sunblind_rotation(kwargs[ATTR_TILT_POSITION])
+        await self._commands.async_send_latest(
+            IqTecCommand.sunblind_move(
+                self._sunblind, rotation=rotation, key=(self.idx, "rotation")
+            )
         )
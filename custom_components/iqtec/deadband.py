@@ -0,0 +1,69 @@
+"""Deadband filtering of measured values."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+import voluptuous as vol
+
+from .const import (
+    CONF_DEADBAND_BYTE,
+    CONF_DEADBAND_FLOAT,
+    CONF_DEADBAND_SHORT,
+    CONF_DEADBAND_TEMPERATURE,
+    CONF_HEARTBEAT,
+    DEFAULT_HEARTBEAT,
+)
+
+# API type each deadband option applies to, rooms use the Temperature one
+DEADBAND_OPTIONS = {
+    "Temperature": CONF_DEADBAND_TEMPERATURE,
+    "float": CONF_DEADBAND_FLOAT,
+    "short": CONF_DEADBAND_SHORT,
+    "byte": CONF_DEADBAND_BYTE,
+}
+
+
+def parse_deadband(value: Any) -> tuple[float, bool]:
+    """Parse an absolute deadband like 0.05, or a relative one like 2 %."""
+    text = str(value).strip()
+    relative = text.endswith("%")
+    try:
+        threshold = float(text.removesuffix("%") or 0)
+    except ValueError:
+        raise vol.Invalid(f"Invalid deadband {value}") from None
+    if threshold < 0:
+        raise vol.Invalid(f"Invalid deadband {value}")
+    return threshold, relative
+
+
+@dataclass(frozen=True, slots=True)
+class IqTecDeadband:
+    """Changes of a measured value too small to be written.
+
+    A value held back is still written once nothing was written for the
+    heartbeat.
+    """
+
+    threshold: float
+    relative: bool = False
+    heartbeat: float = DEFAULT_HEARTBEAT
+
+    @classmethod
+    def from_options(cls, options: dict[str, Any]) -> dict[str, IqTecDeadband]:
+        """Return the configured deadbands by API type."""
+        heartbeat = options.get(CONF_HEARTBEAT, DEFAULT_HEARTBEAT)
+        deadbands = {}
+        for typ, option in DEADBAND_OPTIONS.items():
+            threshold, relative = parse_deadband(options.get(option, 0))
+            if threshold:
+                deadbands[typ] = cls(threshold, relative, heartbeat)
+        return deadbands
+
+    def within(self, old: float | None, new: float | None) -> bool:
+        """Return if a change is too small to be written."""
+        if old is None or new is None:
+            return old is new
+        limit = abs(old) * self.threshold / 100 if self.relative else self.threshold
+        return abs(new - old) < limit
@@ -0,0 +1,54 @@
+"""Diagnostics support for IQtec."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .coordinator import IqTecConfigEntry
+
+TO_REDACT = {CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: IqTecConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data.coordinator
+    topology = coordinator.topology
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "topology": {
+            "name": topology.name,
+            "rooms": len(topology.rooms),
+            "sunblinds": len(topology.sunblinds),
+            "switch_apis": len(topology.switch_apis),
+            "sensor_apis": len(topology.sensor_apis),
+            "calendars": len(topology.calendars),
+        },
+        "coordinator": {
+            "discovered": coordinator.hub is not None,
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval,
+            "overruns": coordinator.overruns,
+            "skipped_polls": coordinator.skipped_polls,
+            "notified_entities": coordinator.notified_count,
+            "skipped_entities": coordinator.skipped_count,
+            "subscribed_apis": len(coordinator.subscribed_apis),
+            "tiers": {
+                tier.name: {
+                    "interval": tier.interval,
+                    "failures": tier.failures,
+                    "last_error": repr(tier.last_error) if tier.last_error else None,
+                }
+                for tier in coordinator.tiers
+            },
+        },
+        "metrics": coordinator.metrics.as_dict(),
+    }
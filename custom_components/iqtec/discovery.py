@@ -0,0 +1,153 @@
+"""Controller topology discovery and its persistent cache."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+import logging
+from typing import Any
+
+from piqtec.controller import Controller
+from requests import RequestException
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util.hass_dict import HassKey
+
+from .api import IqTecStatus
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Host -> controller enumerated by the config flow, until the entry is set up
+DATA_FLOW_CONTROLLERS: HassKey[dict[str, Controller]] = HassKey(
+    f"{DOMAIN}_flow_controllers"
+)
+
+
+@dataclass
+class IqTecTopology:
+    """Units and APIs of a controller, enough to create all entities."""
+
+    name: str
+    # Unit id -> name
+    rooms: dict[str, str] = field(default_factory=dict)
+    sunblinds: dict[str, str] = field(default_factory=dict)
+    # Sunblinds with a tilt time, which support tilt commands
+    tilt_sunblinds: list[str] = field(default_factory=list)
+    # API id -> typ
+    switch_apis: dict[str, str] = field(default_factory=dict)
+    sensor_apis: dict[str, str] = field(default_factory=dict)
+    calendars: dict[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_controller(
+        cls,
+        hub: Controller,
+        status: IqTecStatus,
+        calendars: list[tuple[str, str]],
+    ) -> IqTecTopology:
+        """Build the topology of a discovered controller."""
+        return cls(
+            name=hub.name,
+            rooms={idx: status.rooms[idx].name for idx in hub.rooms},
+            sunblinds={idx: status.sunblinds[idx].name for idx in hub.sunblinds},
+            tilt_sunblinds=[
+                idx for idx in hub.sunblinds if status.sunblinds[idx].full_time_time > 0
+            ],
+            switch_apis={
+                idx: a.typ
+                for d in hub.devices.values()
+                for idx, a in d.switch_apis.items()
+            },
+            sensor_apis={
+                idx: a.typ
+                for d in hub.devices.values()
+                for idx, a in d.sensor_apis.items()
+            },
+            calendars={
+                int(idx.removeprefix("_CALENDAR_")): calname
+                for idx, calname in calendars
+            },
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> IqTecTopology:
+        """Restore a stored topology."""
+        return cls(
+            **data | {"calendars": {int(k): v for k, v in data["calendars"].items()}}
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the topology in a storable form."""
+        return asdict(self)
+
+
+class IqTecDiscoveryCache:
+    """Stores the topology of a controller between restarts."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the cache."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}"
+        )
+
+    async def async_load(self) -> IqTecTopology | None:
+        """Load the stored topology, if any."""
+        if (data := await self._store.async_load()) is None:
+            return None
+        try:
+            return IqTecTopology.from_dict(data)
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.warning("Ignoring invalid cached topology")
+            return None
+
+    async def async_save(self, topology: IqTecTopology) -> None:
+        """Store the topology."""
+        await self._store.async_save(topology.as_dict())
+
+    async def async_remove(self) -> None:
+        """Remove the stored topology."""
+        await self._store.async_remove()
+
+
+async def async_discover(
+    hass: HomeAssistant, host: str
+) -> tuple[Controller, list[tuple[str, str]]]:
+    """Enumerate a controller and read its calendar names."""
+    hub = await async_enumerate(hass, host)
+    return hub, await async_calendar_names(hass, hub)
+
+
+async def async_enumerate(hass: HomeAssistant, host: str) -> Controller:
+    """Enumerate the units and APIs of a controller.
+
+    Errors of the blocking requests are raised as ConnectionError.
+    """
+    try:
+        return await hass.async_add_executor_job(Controller, host)
+    except RequestException as err:
+        raise ConnectionError(f"Enumerating {host} failed: {err}") from err
+
+
+async def async_calendar_names(
+    hass: HomeAssistant, hub: Controller
+) -> list[tuple[str, str]]:
+    """Read the calendar names of a controller."""
+    try:
+        return await hass.async_add_executor_job(hub.get_calendar_names)
+    except RequestException as err:
+        raise ConnectionError(f"Reading calendars failed: {err}") from err
+
+
+@callback
+def async_hand_over(hass: HomeAssistant, host: str, hub: Controller) -> None:
+    """Keep a controller enumerated by the config flow for the entry setup."""
+    hass.data.setdefault(DATA_FLOW_CONTROLLERS, {})[host] = hub
+
+
+@callback
+def async_take_over(hass: HomeAssistant, host: str) -> Controller | None:
+    """Return the controller the config flow enumerated for a host, once."""
+    return hass.data.get(DATA_FLOW_CONTROLLERS, {}).pop(host, None)
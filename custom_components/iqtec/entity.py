@@ -1,17 +1,38 @@
 """Base class for Iqtec Entities."""
 
-from dataclasses import asdict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
 import logging
+from time import monotonic
+from typing import Any
 
+from piqtec.controller import Controller
+from piqtec.type_helpers import RequestSet
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .const import CONF_CURATED_ATTRIBUTES, DOMAIN, OPTIMISTIC_TIMEOUT
 from .coordinator import IqTecCoordinator
+from .deadband import IqTecDeadband
+from .index import IqTecApiEntry
 
 _LOGGER = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class _Pending:
+    """A commanded value the controller has not reported yet."""
+
+    value: Any
+    confirm: Callable[[Any], bool]
+    cancel_expiry: CALLBACK_TYPE
+
+
 class IqTecEntity(CoordinatorEntity):
     """IqTec Base class."""
 
@@ -19,23 +40,250 @@ class IqTecEntity(CoordinatorEntity):
 
     _default_device_info = DeviceInfo(manufacturer="IQtec/Kobra")
 
+    iqtec_state: Any = None
+    # Attributes reported when the curated attributes option is set
+    _curated_attributes: tuple[str, ...] = ()
+    _attributes_state: Any = None
+    _pending: _Pending | None = None
+    # Deadband of the measured value, the state last written and when
+    _deadband: IqTecDeadband | None = None
+    _written: Any = None
+    _written_at: float = 0.0
+    _written_available = False
+    _unsub_heartbeat: CALLBACK_TYPE | None = None
+
     def __init__(
         self,
         coordinator: IqTecCoordinator,
         idx: str,
     ) -> None:
-        """Pass coordinator to CoordinatorEntity."""
-        super().__init__(coordinator)
+        """Pass coordinator to CoordinatorEntity.
+
+        The id is used as listener context, so the entity is only updated when
+        its own values change.
+        """
+        super().__init__(coordinator, context=idx)
         self.idx = idx
-        self._hub = coordinator.hub
+        self._commands = coordinator.commands
         self._attr_unique_id = f"{DOMAIN}-{self.idx}"
+        self._curated = coordinator.config_entry.options.get(
+            CONF_CURATED_ATTRIBUTES, False
+        )
+        self._attributes: dict[str, Any] = {}
+
+    async def async_added_to_hass(self) -> None:
+        """Load the current values, later updates only arrive on change."""
+        await super().async_added_to_hass()
+        if self.coordinator.data is not None:
+            self._handle_coordinator_update()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Drop a commanded value that is still pending."""
+        self._async_clear_pending()
+        self._async_cancel_heartbeat()
+        await super().async_will_remove_from_hass()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator.
+
+        Changes within the deadband are held back until the heartbeat, as
+        long as the availability did not change.
+        """
+        state = self._reconcile(self._controller_state())
+        if (
+            (deadband := self._deadband) is not None
+            and self._pending is None
+            and self._written is not None
+            and self._written_available == self.available
+            and self._insignificant(self._written, state, deadband)
+        ):
+            if self._unsub_heartbeat is None:
+                self._unsub_heartbeat = async_call_later(
+                    self.hass,
+                    max(self._written_at + deadband.heartbeat - monotonic(), 0),
+                    self._async_heartbeat,
+                )
+            return
+        self._async_write_state(state)
+
+    @callback
+    def _async_write_state(self, state: Any) -> None:
+        """Show a state and write it."""
+        self._async_cancel_heartbeat()
+        self._show_state(state)
+        self._written = state
+        self._written_at = monotonic()
+        self._written_available = self.available
+        self.async_write_ha_state()
+
+    @callback
+    def _async_heartbeat(self, _: datetime) -> None:
+        """Write the state held back by the deadband."""
+        self._unsub_heartbeat = None
+        self._async_write_state(self._reconcile(self._controller_state()))
+
+    @callback
+    def _async_cancel_heartbeat(self) -> None:
+        if self._unsub_heartbeat is not None:
+            self._unsub_heartbeat()
+            self._unsub_heartbeat = None
+
+    def _insignificant(self, written: Any, state: Any, deadband: IqTecDeadband) -> bool:
+        """Return if a value differs from the written one within the deadband."""
+        return deadband.within(written, state)
+
+    def _controller_state(self) -> Any:
+        """Return the state the controller reports for the entity."""
+        raise NotImplementedError
+
+    def _show_state(self, state: Any) -> None:
+        """Show a unit state."""
+        self.iqtec_state = state
+
+    def _with_pending(self, state: Any, value: dict[str, Any]) -> Any:
+        """Return a unit state with commanded fields applied."""
+        return replace(state, **value)
+
+    def _confirms(self, state: Any, value: dict[str, Any]) -> bool:
+        """Return if a unit state holds all commanded fields."""
+        return all(getattr(state, name) == v for name, v in value.items())
+
+    def _reconcile(self, state: Any) -> Any:
+        """Return the state to show, keeping a commanded value until confirmed."""
+        if (pending := self._pending) is None:
+            return state
+        if pending.confirm(state):
+            self._async_clear_pending()
+            return state
+        return self._with_pending(state, pending.value)
+
+    @callback
+    def _async_set_optimistic(
+        self, value: Any, confirm: Callable[[Any], bool] | None = None
+    ) -> None:
+        """Show a value the controller accepted before it reports it.
+
+        The value is rolled back if the controller did not report it within
+        OPTIMISTIC_TIMEOUT. By default a report confirms the value when it
+        matches, commands with another outcome pass their own check.
+        """
+        if confirm is None:
+
+            def confirm(state: Any) -> bool:
+                return self._confirms(state, value)
+
+        self._async_clear_pending()
+        state = self._controller_state()
+        if confirm(state):
+            return
+        self._pending = _Pending(
+            value,
+            confirm,
+            async_call_later(self.hass, OPTIMISTIC_TIMEOUT, self._async_expire),
+        )
+        self._async_write_state(self._with_pending(state, value))
+
+    @callback
+    def _async_expire(self, _: datetime) -> None:
+        """Roll back a value the controller did not confirm."""
+        pending, self._pending = self._pending, None
+        state = self._controller_state()
+        if pending is not None and not pending.confirm(state):
+            _LOGGER.warning(
+                "%s: controller did not report %s within %s s, rolling back",
+                self.entity_id,
+                pending.value,
+                OPTIMISTIC_TIMEOUT,
+            )
+        self._async_write_state(state)
+
+    @callback
+    def _async_clear_pending(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel_expiry()
+            self._pending = None
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self.coordinator.data is not None
 
     @property
-    def name(self) -> str:
-        """Return the entity name."""
-        return self.iqtec_state.name
+    def _hub(self) -> Controller:
+        """Return the controller, commands need it to build requests."""
+        if (hub := self.coordinator.hub) is None:
+            raise HomeAssistantError("Controller has not been discovered yet")
+        return hub
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Returns raw iqtec state attributes.
+
+        Computed once per state object, the coordinator delivers a new object
+        whenever the state changes.
+        """
+        if self.iqtec_state is not self._attributes_state:
+            if self._curated:
+                self._attributes = {
+                    name: getattr(self.iqtec_state, name)
+                    for name in self._curated_attributes
+                }
+            else:
+                self._attributes = asdict(self.iqtec_state)
+            self._attributes_state = self.iqtec_state
+        return self._attributes
+
+
+class IqTecApiEntity(IqTecEntity):
+    """Base class for entities backed by a raw device API."""
+
+    def __init__(self, coordinator: IqTecCoordinator, api: IqTecApiEntry) -> None:
+        """Initialise the entity from its index entry."""
+        super().__init__(coordinator, api.idx)
+        self.api = api
+        self._attr_name = api.idx
+        self._deadband = coordinator.deadbands.get(api.typ)
+
+        self.entity_registry_visible_default = False
+
+        self._attr_device_info = self._default_device_info | DeviceInfo(
+            identifiers={(DOMAIN, api.device)}, name=f"_{api.device}"
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Fetch the API while the entity is enabled."""
+        self.async_on_remove(self.coordinator.async_subscribe_apis([self.idx]))
+        await super().async_added_to_hass()
 
     @property
     def extra_state_attributes(self) -> dict[str, str]:
         """Returns raw iqtec state attributes."""
-        return asdict(self.iqtec_state)
+        return {}
+
+    def _controller_state(self) -> Any:
+        """Return the decoded value, None for an error value."""
+        return self.api.decode(self.coordinator.data.api_values)
+
+    def _show_state(self, state: Any) -> None:
+        """Show a value, error values keep the last known value."""
+        if state is not None:
+            self._update_value(state)
+
+    def _with_pending(self, state: Any, value: Any) -> Any:
+        """Return the commanded value."""
+        return value
+
+    def _confirms(self, state: Any, value: Any) -> bool:
+        """Return if the controller reports the commanded value."""
+        return state == value
+
+    def _update_value(self, value: Any) -> None:
+        """Apply a decoded value."""
+        raise NotImplementedError
+
+    def _set_request(self, value: str) -> RequestSet:
+        """Build the request writing a raw value."""
+        return (
+            self._hub.devices[self.api.device].switch_apis[self.idx].set_request(value)
+        )
@@ -0,0 +1,112 @@
+"""Precomputed index of the raw device API entities."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from homeassistant.const import Platform
+
+from .api import IqTecApiValues
+from .const import MANUAL_SWITCHES
+from .discovery import IqTecTopology
+
+ON_OFF_AUTO_OPTIONS = {0: "off", 1: "on", 2: "auto"}
+
+
+def _decode_option(val: float) -> str | None:
+    return ON_OFF_AUTO_OPTIONS.get(int(val))
+
+
+# typ -> platform and decoder of the numeric value
+_SWITCH_TYPES: dict[str, tuple[Platform, Callable[[float], Any]]] = {
+    "OnOff": (Platform.SWITCH, bool),
+    "bool": (Platform.SWITCH, bool),
+    "OnOffAuto": (Platform.SELECT, _decode_option),
+    "Temperature": (Platform.NUMBER, float),
+    "byte": (Platform.NUMBER, float),
+    "float": (Platform.NUMBER, float),
+    "short": (Platform.NUMBER, float),
+}
+_SENSOR_TYPES: dict[str, tuple[Platform, Callable[[float], Any]]] = {
+    "OnOff": (Platform.BINARY_SENSOR, bool),
+    "bool": (Platform.BINARY_SENSOR, bool),
+    "Temperature": (Platform.SENSOR, float),
+    "byte": (Platform.SENSOR, float),
+    "float": (Platform.SENSOR, float),
+    "short": (Platform.SENSOR, float),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class IqTecApiEntry:
+    """A raw device API backing one entity."""
+
+    idx: str
+    device: str
+    key: str
+    typ: str
+    # Position of the value in the decoded snapshot columns
+    slot: int
+    decoder: Callable[[float], Any]
+
+    def decode(self, values: IqTecApiValues) -> Any:
+        """Return the typed value from a snapshot, None for error values."""
+        if (val := values.get(self.slot)) is None:
+            return None
+        return self.decoder(val)
+
+
+@dataclass
+class IqTecEntityIndex:
+    """Raw API entities grouped by platform."""
+
+    platforms: dict[Platform, list[IqTecApiEntry]] = field(default_factory=dict)
+    # API id -> entry, including APIs without an entity
+    apis: dict[str, IqTecApiEntry] = field(default_factory=dict)
+    # API id -> slot
+    slots: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_topology(
+        cls, topology: IqTecTopology, raw_entities: bool = True
+    ) -> IqTecEntityIndex:
+        """Classify all APIs of the topology in a single pass.
+
+        Without raw entities the APIs of the topology are only indexed for
+        reading, the manual switches still get entities.
+        """
+        index = cls()
+        for apis, types in (
+            (topology.switch_apis, _SWITCH_TYPES),
+            (topology.sensor_apis, _SENSOR_TYPES),
+        ):
+            for idx, typ in apis.items():
+                if (match := types.get(typ)) is None:
+                    continue
+                platform, decoder = match
+                index.add(platform, idx, typ, decoder, entity=raw_entities)
+        for idx in MANUAL_SWITCHES:
+            index.add(Platform.SWITCH, idx, "bool", bool)
+        return index
+
+    def add(
+        self,
+        platform: Platform,
+        idx: str,
+        typ: str,
+        decoder: Callable[[float], Any],
+        entity: bool = True,
+    ) -> None:
+        """Add an API entry, listed under its platform if it gets an entity."""
+        device, _, key = idx.partition(".")
+        slot = self.slots.setdefault(idx, len(self.slots))
+        entry = IqTecApiEntry(idx, device, key, typ, slot, decoder)
+        self.apis[idx] = entry
+        if entity:
+            self.platforms.setdefault(platform, []).append(entry)
+
+    def get(self, platform: Platform) -> list[IqTecApiEntry]:
+        """Return the entries of a platform."""
+        return self.platforms.get(platform, [])
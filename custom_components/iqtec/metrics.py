@@ -0,0 +1,89 @@
+"""Rolling poll and command statistics of an IQtec controller."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from typing import Any
+
+from .const import METRICS_WINDOW
+
+# Upper bucket edges of latencies in ms and of counts
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class IqTecHistogram:
+    """Histogram over the most recent samples, in fixed memory."""
+
+    __slots__ = ("_buckets", "_counts", "_samples", "total")
+
+    def __init__(self, buckets: tuple[float, ...], window: int = METRICS_WINDOW):
+        """Initialize an empty histogram."""
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._samples: deque[float] = deque(maxlen=window)
+        self.total = 0
+
+    def add(self, value: float) -> None:
+        """Add a sample, dropping the oldest one once the window is full."""
+        if len(self._samples) == self._samples.maxlen:
+            self._counts[bisect_left(self._buckets, self._samples[0])] -= 1
+        self._samples.append(value)
+        self._counts[bisect_left(self._buckets, value)] += 1
+        self.total += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return percentiles and bucket counts of the window."""
+        if not self._samples:
+            return {"total": self.total}
+        ordered = sorted(self._samples)
+        last = len(ordered) - 1
+        labels = [f"<={edge}" for edge in self._buckets] + [f">{self._buckets[-1]}"]
+        return {
+            "total": self.total,
+            "window": len(ordered),
+            "min": ordered[0],
+            "p50": ordered[last // 2],
+            "p90": ordered[last * 9 // 10],
+            "p99": ordered[last * 99 // 100],
+            "max": ordered[-1],
+            "buckets": {
+                label: count
+                for label, count in zip(labels, self._counts, strict=True)
+                if count
+            },
+        }
+
+
+class IqTecMetrics:
+    """Statistics of the polls and commands of one controller."""
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.fetch_ms: defaultdict[str, IqTecHistogram] = defaultdict(
+            lambda: IqTecHistogram(LATENCY_BUCKETS)
+        )
+        self.command_ms: defaultdict[str, IqTecHistogram] = defaultdict(
+            lambda: IqTecHistogram(LATENCY_BUCKETS)
+        )
+        self.snapshot_size = IqTecHistogram(COUNT_BUCKETS)
+        self.changed_values = IqTecHistogram(COUNT_BUCKETS)
+        self.notified_entities = IqTecHistogram(COUNT_BUCKETS)
+        self.errors: Counter[str] = Counter()
+
+    def add_error(self, kind: str, err: BaseException) -> None:
+        """Count a failed fetch or command."""
+        reason = "timeout" if isinstance(err, TimeoutError) else "error"
+        self.errors[f"{kind}_{reason}"] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all statistics."""
+        return {
+            "fetch_ms": {name: h.as_dict() for name, h in self.fetch_ms.items()},
+            "command_ms": {name: h.as_dict() for name, h in self.command_ms.items()},
+            "snapshot_size": self.snapshot_size.as_dict(),
+            "changed_values": self.changed_values.as_dict(),
+            "notified_entities": self.notified_entities.as_dict(),
+            "errors": dict(self.errors),
+        }
@@ -0,0 +1,71 @@
+"""Motion model of moving IQtec sunblinds."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from piqtec.constants import SUNBLIND_EXTENDED, SUNBLIND_TILT_CLOSED
+from piqtec.unit.sunblind import SunblindState
+
+from .const import COVER_TRAVEL_TIME
+
+# Weight of a new speed observation
+SPEED_SMOOTHING = 0.3
+
+
+def direction(state: SunblindState) -> int:
+    """Return 1 for a sunblind moving down, -1 for up and 0 when it stands."""
+    if state.out_dn_1 or state.out_dn_2:
+        return 1
+    if state.out_up_1 or state.out_up_2:
+        return -1
+    return 0
+
+
+@dataclass(slots=True)
+class IqTecCoverMotion:
+    """Estimates position and rotation of a sunblind between polls.
+
+    A moving sunblind first tilts towards the end of its direction, taking
+    full_time_time for the whole tilt, then travels at the speed observed
+    on earlier polls. The speed starts from the configured move_time.
+    """
+
+    # Position units per second
+    speed: float = SUNBLIND_EXTENDED / COVER_TRAVEL_TIME
+    state: SunblindState | None = None
+    time: float = 0.0
+
+    def update(self, state: SunblindState, now: float) -> None:
+        """Start estimating from a reported state."""
+        previous, elapsed = self.state, now - self.time
+        if previous is None:
+            self.speed = SUNBLIND_EXTENDED / (state.move_time or COVER_TRAVEL_TIME)
+        elif (
+            elapsed > 0
+            and direction(state)
+            and direction(state) == direction(previous)
+            and state.position != previous.position
+        ):
+            observed = abs(state.position - previous.position) / elapsed
+            self.speed += SPEED_SMOOTHING * (observed - self.speed)
+        self.state, self.time = state, now
+
+    def estimate(self, now: float) -> tuple[int, int]:
+        """Return the estimated position and rotation."""
+        state = self.state
+        moving = direction(state)
+        if not moving:
+            return state.position, state.rotation
+        elapsed = now - self.time
+        tilt_target = SUNBLIND_TILT_CLOSED if moving > 0 else 0
+        tilt_left = abs(tilt_target - state.rotation)
+        tilt_time = state.full_time_time / 1000
+        if tilt_time <= 0:
+            rotation, travel = state.rotation, elapsed
+        else:
+            tilt_speed = SUNBLIND_TILT_CLOSED / tilt_time
+            rotation = state.rotation + moving * min(elapsed * tilt_speed, tilt_left)
+            travel = max(elapsed - tilt_left / tilt_speed, 0)
+        position = state.position + moving * travel * self.speed
+        return int(min(max(position, 0), SUNBLIND_EXTENDED)), int(rotation)
@@ -1,6 +1,5 @@
 """IQtec Numbers."""
 
-import logging
 import sys
 
 from homeassistant.components.number import (
@@ -8,15 +7,13 @@ from homeassistant.components.number import (
     NumberEntity,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
-from .const import DOMAIN
-from .coordinator import IqTecConfigEntry, IqTecCoordinator
-from .entity import IqTecEntity
-
-_LOGGER = logging.getLogger(__name__)
+from .commands import IqTecCommand
+from .coordinator import IqTecConfigEntry
+from .entity import IqTecApiEntity
 
 
 async def async_setup_entry(
@@ -26,62 +23,27 @@ async def async_setup_entry(
 ) -> None:
     """Setup Sensor entries."""
     coordinator = config_entry.runtime_data.coordinator
-
-    sensors = []
-
-    for d_idx, d in coordinator.hub.devices.items():
-        for idx, a in d.switch_apis.items():
-            if a.typ == "Temperature":
-                sensors.append(IqTecTemperatureNumber(coordinator, idx, d_idx))
-            if a.typ == "byte":
-                sensors.append(IqTecByteNumber(coordinator, idx, d_idx))
-            if a.typ in {"float", "short"}:
-                sensors.append(IqTecFloatNumber(coordinator, idx, d_idx))
-    async_add_entities(sensors)
+    async_add_entities(
+        _NUMBER_CLASSES[api.typ](coordinator, api)
+        for api in coordinator.index.get(Platform.NUMBER)
+    )
 
 
-class _IqTecBaseNumber(IqTecEntity, NumberEntity):
+class _IqTecBaseNumber(IqTecApiEntity, NumberEntity):
     """IQtec Base Number."""
 
-    def __init__(self, coordinator: IqTecCoordinator, idx: str, device: str) -> None:
-        """Initialise IQtec Number."""
-        super().__init__(coordinator, idx)
-        self._device_idx = device
-        self._val_idx = idx.split(".")[1]
-
-        self.entity_registry_visible_default = False
-
-        self._attr_device_info = self._default_device_info | DeviceInfo(
-            identifiers={(DOMAIN, device)}, name=f"_{device}"
-        )
-
-    @property
-    def name(self) -> str:
-        """Return the entity name."""
-        return self.idx
-
-    @property
-    def extra_state_attributes(self) -> dict[str, str]:
-        """Returns raw iqtec state attributes."""
-        return {}
-
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        val = self.coordinator.data.devices[self._device_idx].switches[self.idx]
-        if "!" not in val:
-            self._attr_native_value = float(val)
-        _LOGGER.debug("Updating device: %s", self.idx)
-        self.async_write_ha_state()
+    def _update_value(self, value: float) -> None:
+        """Apply a decoded value."""
+        self._attr_native_value = value
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
-        r = (
-            self._hub.devices[self._device_idx]
-            .switch_apis[self.idx]
-            .set_request(str(value))
-        )
-        self.hass.async_add_executor_job(self._hub.api_call, r)
+        if await self._commands.async_send_latest(
+            IqTecCommand.api_request(
+                self.idx, self._set_request(str(value)), key=(self.idx, "value")
+            )
+        ):
+            self._async_set_optimistic(value)
 
 
 class IqTecTemperatureNumber(_IqTecBaseNumber):
@@ -110,3 +72,11 @@ class IqTecFloatNumber(_IqTecBaseNumber):
     _attr_native_step = 0.001
 
     mode = "box"
+
+
+_NUMBER_CLASSES: dict[str, type[_IqTecBaseNumber]] = {
+    "Temperature": IqTecTemperatureNumber,
+    "byte": IqTecByteNumber,
+    "float": IqTecFloatNumber,
+    "short": IqTecFloatNumber,
+}
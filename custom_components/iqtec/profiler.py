@@ -0,0 +1,116 @@
+"""Profiling of the coordinator update cycle."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+import contextlib
+import cProfile
+import io
+import pstats
+from time import perf_counter
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+# Entries of the profile and of the slowest entities in the summary
+PROFILE_SUMMARY_ROWS = 25
+
+
+def _listener_name(update_callback: Callable[[], None], context: Any) -> str:
+    """Return the entity id behind a coordinator listener."""
+    entity = getattr(update_callback, "__self__", None)
+    return getattr(entity, "entity_id", None) or str(context or update_callback)
+
+
+class IqTecProfiler:
+    """Profiles the next coordinator cycles.
+
+    Everything running on the event loop during a cycle ends up in the
+    profile, next to the time spent fetching, decoding and dispatching and
+    the time each entity took to handle its update.
+    """
+
+    def __init__(self, cycles: int) -> None:
+        """Initialize the profiler."""
+        self.cycles = cycles
+        self.completed = 0
+        self.phases: defaultdict[str, float] = defaultdict(float)
+        self.entities: defaultdict[str, float] = defaultdict(float)
+        self.done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._profile = cProfile.Profile()
+        self._active = 0
+
+    @contextlib.contextmanager
+    def cycle(self) -> Iterator[None]:
+        """Profile one coordinator cycle."""
+        if not self._active:
+            self._profile.enable()
+        self._active += 1
+        try:
+            with self.phase("total"):
+                yield
+        finally:
+            self._active -= 1
+            if not self._active:
+                self._profile.disable()
+            self.completed += 1
+            if self.completed >= self.cycles and not self.done.done():
+                self.done.set_result(None)
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase of the cycle."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += perf_counter() - start
+
+    def call_listener(self, update_callback: Callable[[], None], context: Any) -> None:
+        """Update a coordinator listener and time it."""
+        start = perf_counter()
+        try:
+            update_callback()
+        finally:
+            self.entities[_listener_name(update_callback, context)] += (
+                perf_counter() - start
+            )
+
+    def summary(self) -> dict[str, Any]:
+        """Return the phases and the slowest entities, in ms per cycle."""
+        cycles = max(self.completed, 1)
+        slowest = sorted(self.entities.items(), key=lambda item: -item[1])
+        return {
+            "cycles": self.completed,
+            "phases_ms": {
+                name: round(total / cycles * 1000, 3)
+                for name, total in self.phases.items()
+            },
+            "slowest_entities_ms": {
+                name: round(total / cycles * 1000, 3)
+                for name, total in slowest[:PROFILE_SUMMARY_ROWS]
+            },
+        }
+
+    async def async_write(self, hass: HomeAssistant, path: str) -> dict[str, Any]:
+        """Write the profile and a summary next to it, return the summary."""
+        summary = self.summary()
+        await hass.async_add_executor_job(self._write, path, summary)
+        return {**summary, "profile": path, "summary": f"{path}.txt"}
+
+    def _write(self, path: str, summary: dict[str, Any]) -> None:
+        self._profile.dump_stats(path)
+        out = io.StringIO()
+        out.write(f"Cycles: {summary['cycles']}\n\nPhases (ms per cycle):\n")
+        for name, value in summary["phases_ms"].items():
+            out.write(f"  {name:<10} {value:>10.3f}\n")
+        out.write("\nSlowest entities (ms per cycle):\n")
+        for name, value in summary["slowest_entities_ms"].items():
+            out.write(f"  {value:>10.3f}  {name}\n")
+        out.write("\n")
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_SUMMARY_ROWS)
+        with open(f"{path}.txt", "w", encoding="utf-8") as file:
+            file.write(out.getvalue())
@@ -0,0 +1,225 @@
+"""Recording and replay of IQtec controller traffic."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Collection, Sequence
+from dataclasses import asdict, dataclass, field
+from functools import partial
+import gzip
+import json
+import logging
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+
+from piqtec.unit.room import RoomState
+from piqtec.unit.sunblind import SunblindState
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .api import IqTecApiClient, IqTecStatus, describe
+from .commands import IqTecCommand
+from .discovery import IqTecTopology
+
+if TYPE_CHECKING:
+    from .coordinator import IqTecCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+RECORDING_VERSION = 1
+# Buffered records written together
+RECORDING_FLUSH_RECORDS = 100
+
+
+def _describe(command: IqTecCommand) -> str:
+    """Return a command as text, staged ones by function and arguments."""
+    if command.request is not None:
+        return describe(command.request)
+    if isinstance(command.build, partial):
+        return f"{command.build.func.__name__}{command.build.keywords}"
+    return repr(command.build)
+
+
+class IqTecRecorder:
+    """Records controller traffic to a gzip compressed JSON lines file.
+
+    The first line holds the topology. Status records only hold the units and
+    API values that changed since the previous record, command records hold
+    the requests and the status tiers they affect.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str, topology: IqTecTopology) -> None:
+        """Initialize the recorder."""
+        self.hass = hass
+        self.path = path
+        self.records = 0
+        self._start = monotonic()
+        self._last: dict[str, dict[str, Any]] = {
+            "rooms": {},
+            "sunblinds": {},
+            "apis": {},
+        }
+        self._buffer = [
+            json.dumps(
+                {
+                    "version": RECORDING_VERSION,
+                    "started": dt_util.utcnow().isoformat(),
+                    "topology": topology.as_dict(),
+                }
+            )
+        ]
+        self._lock = asyncio.Lock()
+
+    def _offset(self) -> float:
+        return round(monotonic() - self._start, 3)
+
+    @callback
+    def record_status(self, status: IqTecStatus, tiers: Sequence[str]) -> None:
+        """Record a fetched status."""
+        record: dict[str, Any] = {"t": self._offset(), "tiers": list(tiers)}
+        for name in tiers:
+            table: dict[str, Any] = getattr(status, name)
+            last = self._last[name]
+            changed = {idx: v for idx, v in table.items() if last.get(idx) != v}
+            last.update(changed)
+            if changed and name != "apis":
+                changed = {idx: asdict(state) for idx, state in changed.items()}
+            if changed:
+                record[name] = changed
+        self._append(record)
+
+    @callback
+    def record_commands(self, commands: Sequence[IqTecCommand]) -> None:
+        """Record a batch of commands sent to the controller."""
+        self._append(
+            {
+                "t": self._offset(),
+                "commands": [_describe(c) for c in commands],
+                "tiers": sorted({t for c in commands for t in c.tiers}),
+            }
+        )
+
+    @callback
+    def _append(self, record: dict[str, Any]) -> None:
+        self.records += 1
+        self._buffer.append(json.dumps(record, separators=(",", ":"), default=str))
+        if len(self._buffer) >= RECORDING_FLUSH_RECORDS:
+            self.hass.async_create_background_task(
+                self._async_flush(), "iqtec recording flush"
+            )
+
+    async def _async_flush(self) -> None:
+        """Write the buffered records, flushes are written in order."""
+        lines, self._buffer = self._buffer, []
+        async with self._lock:
+            if lines:
+                await self.hass.async_add_executor_job(_append_lines, self.path, lines)
+
+    async def async_close(self) -> None:
+        """Write all remaining records."""
+        await self._async_flush()
+        _LOGGER.debug("Recorded %s records to %s", self.records, self.path)
+
+
+def _append_lines(path: str, lines: list[str]) -> None:
+    # Every flush appends a gzip member, gzip readers join them transparently
+    with gzip.open(path, "at", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+@dataclass
+class IqTecRecording:
+    """Recorded controller traffic."""
+
+    topology: IqTecTopology
+    records: list[dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: str) -> IqTecRecording:
+        """Read a recording, this does blocking I/O."""
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            header = json.loads(file.readline())
+            if header.get("version") != RECORDING_VERSION:
+                raise ValueError(f"Unsupported recording version in {path}")
+            return cls(
+                IqTecTopology.from_dict(header["topology"]),
+                [json.loads(line) for line in file if line.strip()],
+            )
+
+    @property
+    def duration(self) -> float:
+        """Return the recorded time span in seconds."""
+        return self.records[-1]["t"] if self.records else 0.0
+
+
+class IqTecReplayClient(IqTecApiClient):
+    """Client serving a recording in place of a controller.
+
+    Fetches return the controller state as recorded up to the replay
+    position. Commands are accepted without being sent anywhere.
+    """
+
+    def __init__(self, hass: HomeAssistant, recording: IqTecRecording) -> None:
+        """Initialize the replay client."""
+        super().__init__(hass, "replay")
+        self.recording = recording
+        self._status = IqTecStatus()
+
+    @property
+    def ready(self) -> bool:
+        """Return if the client can fetch the status."""
+        return True
+
+    async def async_fetch(
+        self,
+        *,
+        rooms: bool = False,
+        sunblinds: bool = False,
+        apis: bool = False,
+        api_ids: Collection[str] | None = None,
+    ) -> IqTecStatus:
+        """Return the replayed status."""
+        replayed = self._status.apis
+        if api_ids is not None:
+            replayed = {idx: replayed[idx] for idx in api_ids if idx in replayed}
+        return IqTecStatus(
+            rooms=dict(self._status.rooms) if rooms else {},
+            sunblinds=dict(self._status.sunblinds) if sunblinds else {},
+            apis=dict(replayed) if apis else {},
+        )
+
+    async def async_execute(self, commands: Sequence[IqTecCommand]) -> None:
+        """Accept a batch of commands."""
+        self._async_command_sent(*{t for c in commands for t in c.tiers})
+
+    async def async_replay(
+        self, coordinator: IqTecCoordinator, *, realtime: bool = True
+    ) -> int:
+        """Feed the recording to a coordinator, returns the number of polls.
+
+        With realtime the recorded timing is kept, otherwise records are
+        replayed as fast as the coordinator processes them. Each status record
+        refreshes the tiers it recorded, whatever their interval.
+        """
+        start = monotonic()
+        polls = 0
+        for record in self.recording.records:
+            if realtime and (delay := start + record["t"] - monotonic()) > 0:
+                await asyncio.sleep(delay)
+            if "commands" in record:
+                self._async_command_sent(*record["tiers"])
+                continue
+            self._apply(record)
+            coordinator.async_mark_due(*record["tiers"])
+            await coordinator.async_refresh()
+            polls += 1
+        return polls
+
+    def _apply(self, record: dict[str, Any]) -> None:
+        """Apply the changes of a status record."""
+        for idx, state in record.get("rooms", {}).items():
+            self._status.rooms[idx] = RoomState(**state)
+        for idx, state in record.get("sunblinds", {}).items():
+            self._status.sunblinds[idx] = SunblindState(**state)
+        self._status.apis.update(record.get("apis", {}))
@@ -1,17 +1,13 @@
 """IQtec Selects."""
 
-import logging
-
 from homeassistant.components.select import SelectEntity
-from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
-from .const import DOMAIN
-from .coordinator import IqTecConfigEntry, IqTecCoordinator
-from .entity import IqTecEntity
-
-_LOGGER = logging.getLogger(__name__)
+from .commands import IqTecCommand
+from .coordinator import IqTecConfigEntry
+from .entity import IqTecApiEntity
 
 
 async def async_setup_entry(
@@ -21,61 +17,24 @@ async def async_setup_entry(
 ) -> None:
     """Setup Select entries."""
     coordinator = config_entry.runtime_data.coordinator
-
-    switches = []
-    for d_idx, d in coordinator.hub.devices.items():
-        for idx, a in d.switch_apis.items():
-            if a.typ == "OnOffAuto":
-                switches.append(IqTecOnOffAuto(coordinator, idx, d_idx))
-    async_add_entities(switches)
+    async_add_entities(
+        IqTecOnOffAuto(coordinator, api)
+        for api in coordinator.index.get(Platform.SELECT)
+    )
 
 
-class IqTecOnOffAuto(IqTecEntity, SelectEntity):
+class IqTecOnOffAuto(IqTecApiEntity, SelectEntity):
     """IQtec OnOffAuto Entity."""
 
     options = ["auto", "on", "off"]
 
-    def __init__(self, coordinator: IqTecCoordinator, idx: str, device: str) -> None:
-        """Initialise IQtec OnOffAuto.."""
-        super().__init__(coordinator, idx)
-        self._device_idx = device
-        self._val_idx = idx.split(".")[1]
-
-        self.entity_registry_visible_default = False
-
-        self._attr_device_info = self._default_device_info | DeviceInfo(
-            identifiers={(DOMAIN, device)}, name=f"_{device}"
-        )
-
-    @property
-    def name(self) -> str:
-        """Return the entity name."""
-        return self.idx
-
-    @property
-    def extra_state_attributes(self) -> dict[str, str]:
-        """Returns raw iqtec state attributes."""
-        return {}
-
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        val = self.coordinator.data.devices[self._device_idx].switches[self.idx]
-        match val:
-            case "0":
-                self._attr_current_option = "off"
-            case "1":
-                self._attr_current_option = "on"
-            case "2":
-                self._attr_current_option = "auto"
-        _LOGGER.debug("Updating device: %s", self.idx)
-        self.async_write_ha_state()
+    def _update_value(self, value: str) -> None:
+        """Apply a decoded value."""
+        self._attr_current_option = value
 
     async def async_select_option(self, option: str) -> None:
         """Turn the entity on."""
-        r = (
-            self._hub.devices[self._device_idx]
-            .switch_apis[self.idx]
-            .set_request(option)
+        await self._commands.async_send(
+            IqTecCommand.api_request(self.idx, self._set_request(option))
         )
-        self.hass.async_add_executor_job(self._hub.api_call, r)
+        self._async_set_optimistic(option)
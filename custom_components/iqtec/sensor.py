@@ -1,22 +1,17 @@
 """IQtec Sensors."""
 
-import logging
-
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
-from .const import DOMAIN
-from .coordinator import IqTecConfigEntry, IqTecCoordinator
-from .entity import IqTecEntity
-
-_LOGGER = logging.getLogger(__name__)
+from .coordinator import IqTecConfigEntry
+from .entity import IqTecApiEntity
 
 
 async def async_setup_entry(
@@ -26,55 +21,20 @@ async def async_setup_entry(
 ) -> None:
     """Setup Sensor entries."""
     coordinator = config_entry.runtime_data.coordinator
+    async_add_entities(
+        _SENSOR_CLASSES[api.typ](coordinator, api)
+        for api in coordinator.index.get(Platform.SENSOR)
+    )
 
-    sensors = []
-
-    for d_idx, d in coordinator.hub.devices.items():
-        for idx, a in d.sensor_apis.items():
-            if a.typ == "Temperature":
-                sensors.append(IqTecTemperatureSensor(coordinator, idx, d_idx))
-            if a.typ == "byte":
-                sensors.append(IqTecIntSensor(coordinator, idx, d_idx))
-            if a.typ in {"float", "short"}:
-                sensors.append(IqTecIntSensor(coordinator, idx, d_idx))
-    async_add_entities(sensors)
 
-
-class _IqTecBaseSensor(IqTecEntity, SensorEntity):
+class _IqTecBaseSensor(IqTecApiEntity, SensorEntity):
     """IQtec Base Sensor."""
 
     _attr_state_class = SensorStateClass.MEASUREMENT
 
-    def __init__(self, coordinator: IqTecCoordinator, idx: str, device: str) -> None:
-        """Initialise IQtec Temp sensor."""
-        super().__init__(coordinator, idx)
-        self._device_idx = device
-        self._val_idx = idx.split(".")[1]
-
-        self.entity_registry_visible_default = False
-
-        self._attr_device_info = self._default_device_info | DeviceInfo(
-            identifiers={(DOMAIN, device)}, name=f"_{device}"
-        )
-
-    @property
-    def name(self) -> str:
-        """Return the entity name."""
-        return self.idx
-
-    @property
-    def extra_state_attributes(self) -> dict[str, str]:
-        """Returns raw iqtec state attributes."""
-        return {}
-
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        val = self.coordinator.data.devices[self._device_idx].sensors[self.idx]
-        if "!" not in val:
-            self._attr_native_value = float(val)
-        _LOGGER.debug("Updating device: %s", self.idx)
-        self.async_write_ha_state()
+    def _update_value(self, value: float) -> None:
+        """Apply a decoded value."""
+        self._attr_native_value = value
 
 
 class IqTecTemperatureSensor(_IqTecBaseSensor):
@@ -95,3 +55,11 @@ class IqTecIntSensor(_IqTecBaseSensor):
 
 class IqTecFloatSensor(_IqTecBaseSensor):
     """IQtec Number Entity."""
+
+
+_SENSOR_CLASSES: dict[str, type[_IqTecBaseSensor]] = {
+    "Temperature": IqTecTemperatureSensor,
+    "byte": IqTecIntSensor,
+    "float": IqTecIntSensor,
+    "short": IqTecIntSensor,
+}
@@ -0,0 +1,513 @@
+"""Services of the IQtec integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import os
+from typing import Any
+
+from piqtec.constants import SUNBLIND_COMMANDS
+from piqtec.type_helpers import RequestSet
+from piqtec.unit.sunblind import Sunblind
+import voluptuous as vol
+
+from homeassistant.components.climate import (
+    ATTR_HVAC_MODE,
+    ATTR_PRESET_MODE,
+    DEFAULT_MAX_TEMP,
+    DEFAULT_MIN_TEMP,
+    HVACMode,
+)
+from homeassistant.components.cover import ATTR_POSITION, ATTR_TILT_POSITION
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import ATTR_COMMAND, ATTR_TEMPERATURE
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.util import dt as dt_util
+
+from .climate import (
+    HVAC_MODE_CALLS,
+    PRESET_CALLS,
+    calendar_calls,
+    temperature_calls,
+)
+from .commands import IqTecCommand
+from .const import COVER_SETTLE_INTERVAL, COVER_TRAVEL_TIME, DOMAIN, REQUEST_TIMEOUT
+from .coordinator import IqTecConfigEntry, IqTecCoordinator
+from .cover import sunblind_position, sunblind_rotation
+from .index import ON_OFF_AUTO_OPTIONS
+from .motion import direction
+
+ATTR_APIS = "apis"
+ATTR_CALENDAR = "calendar"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_CYCLES = "cycles"
+ATTR_FILENAME = "filename"
+ATTR_ROOM = "room"
+ATTR_ROOMS = "rooms"
+ATTR_SUNBLINDS = "sunblinds"
+ATTR_VALUES = "values"
+
+SERVICE_COVER_GROUP_COMMAND = "cover_group_command"
+SERVICE_PROFILE = "profile"
+SERVICE_READ_APIS = "read_apis"
+SERVICE_SET_COVER_POSITIONS = "set_cover_positions"
+SERVICE_SET_ROOMS = "set_rooms"
+SERVICE_START_RECORDING = "start_recording"
+SERVICE_STOP_RECORDING = "stop_recording"
+SERVICE_WRITE_APIS = "write_apis"
+
+_ENTRY_SCHEMA = vol.Schema({vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string})
+
+START_RECORDING_SCHEMA = _ENTRY_SCHEMA.extend({vol.Optional(ATTR_FILENAME): cv.string})
+
+# Selects every sunblind of the controller
+ALL_SUNBLINDS = "all"
+
+COVER_COMMANDS = {
+    "open": SUNBLIND_COMMANDS.UP,
+    "close": SUNBLIND_COMMANDS.DOWN,
+    "stop": SUNBLIND_COMMANDS.STOP,
+}
+
+_SUNBLINDS_SCHEMA = _ENTRY_SCHEMA.extend(
+    {
+        vol.Exclusive(ATTR_ROOM, "sunblinds"): cv.string,
+        vol.Exclusive(ATTR_SUNBLINDS, "sunblinds"): vol.All(
+            cv.ensure_list, [cv.string]
+        ),
+    }
+)
+
+COVER_GROUP_COMMAND_SCHEMA = vol.All(
+    _SUNBLINDS_SCHEMA.extend({vol.Required(ATTR_COMMAND): vol.In(COVER_COMMANDS)}),
+    cv.has_at_least_one_key(ATTR_ROOM, ATTR_SUNBLINDS),
+)
+
+SET_COVER_POSITIONS_SCHEMA = vol.All(
+    _SUNBLINDS_SCHEMA.extend(
+        {
+            vol.Optional(ATTR_POSITION): vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=100)
+            ),
+            vol.Optional(ATTR_TILT_POSITION): vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=100)
+            ),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_ROOM, ATTR_SUNBLINDS),
+    cv.has_at_least_one_key(ATTR_POSITION, ATTR_TILT_POSITION),
+)
+
+_ROOM_SETTINGS_SCHEMA = vol.All(
+    {
+        vol.Optional(ATTR_HVAC_MODE): vol.All(
+            vol.Coerce(HVACMode), vol.In(HVAC_MODE_CALLS)
+        ),
+        vol.Optional(ATTR_PRESET_MODE): vol.In(PRESET_CALLS),
+        vol.Optional(ATTR_CALENDAR): vol.Any(vol.Coerce(int), cv.string),
+        vol.Optional(ATTR_TEMPERATURE): vol.All(
+            vol.Coerce(float), vol.Range(min=DEFAULT_MIN_TEMP, max=DEFAULT_MAX_TEMP)
+        ),
+    },
+    cv.has_at_least_one_key(
+        ATTR_HVAC_MODE, ATTR_PRESET_MODE, ATTR_CALENDAR, ATTR_TEMPERATURE
+    ),
+)
+
+SET_ROOMS_SCHEMA = _ENTRY_SCHEMA.extend(
+    {vol.Required(ATTR_ROOMS): {cv.string: _ROOM_SETTINGS_SCHEMA}}
+)
+
+READ_APIS_SCHEMA = _ENTRY_SCHEMA.extend(
+    {vol.Optional(ATTR_APIS): vol.All(cv.ensure_list, [cv.string])}
+)
+
+WRITE_APIS_SCHEMA = _ENTRY_SCHEMA.extend(
+    {
+        vol.Required(ATTR_VALUES): vol.All(
+            {cv.string: vol.Any(bool, int, float, cv.string)}, vol.Length(min=1)
+        )
+    }
+)
+
+
+def _on_off(value: Any) -> str:
+    return "1" if cv.boolean(value) else "0"
+
+
+# API typ -> validator returning the raw value written, as the entities write it
+API_VALUE_SCHEMAS: dict[str, Callable[[Any], str]] = {
+    "OnOff": _on_off,
+    "bool": _on_off,
+    "OnOffAuto": vol.In(list(ON_OFF_AUTO_OPTIONS.values())),
+    "Temperature": vol.All(vol.Coerce(float), vol.Coerce(str)),
+    "float": vol.All(vol.Coerce(float), vol.Coerce(str)),
+    "byte": vol.All(vol.Coerce(int), vol.Range(min=0, max=255), vol.Coerce(str)),
+    "short": vol.All(
+        vol.Coerce(int), vol.Range(min=-32768, max=32767), vol.Coerce(str)
+    ),
+}
+
+PROFILE_SCHEMA = _ENTRY_SCHEMA.extend(
+    {
+        vol.Optional(ATTR_CYCLES, default=5): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional(ATTR_FILENAME): cv.string,
+    }
+)
+
+
+def _get_coordinator(hass: HomeAssistant, call: ServiceCall) -> IqTecCoordinator:
+    """Return the coordinator of the config entry a service call targets."""
+    entry: IqTecConfigEntry | None = hass.config_entries.async_get_entry(
+        call.data[ATTR_CONFIG_ENTRY_ID]
+    )
+    if entry is None or entry.domain != DOMAIN:
+        raise ServiceValidationError(
+            f"Config entry {call.data[ATTR_CONFIG_ENTRY_ID]} not found"
+        )
+    if entry.state is not ConfigEntryState.LOADED:
+        raise ServiceValidationError(f"{entry.title} is not loaded")
+    return entry.runtime_data.coordinator
+
+
+def _resolve_apis(coordinator: IqTecCoordinator, apis: list[str] | None) -> list[str]:
+    """Return the given API ids after checking them, all APIs by default."""
+    if apis is None:
+        return list(coordinator.index.apis)
+    if unknown := [idx for idx in apis if idx not in coordinator.index.apis]:
+        raise ServiceValidationError(f"Unknown APIs {', '.join(unknown)}")
+    return apis
+
+
+def _resolve_unit(
+    hass: HomeAssistant,
+    coordinator: IqTecCoordinator,
+    item: str,
+    units: dict[str, str],
+) -> str:
+    """Return the id of a room or sunblind given by id, name or entity id."""
+    if item in units:
+        return item
+    if (entity := er.async_get(hass).async_get(item)) is not None and (
+        entity.config_entry_id == coordinator.config_entry.entry_id
+    ):
+        idx = entity.unique_id.removeprefix(f"{DOMAIN}-")
+        if idx in units:
+            return idx
+    for idx, name in units.items():
+        if name == item:
+            return idx
+    raise ServiceValidationError(f"Unknown room or sunblind {item}")
+
+
+def _get_sunblinds(
+    hass: HomeAssistant, coordinator: IqTecCoordinator, call: ServiceCall
+) -> list[str]:
+    """Return the ids of the sunblinds a service call targets.
+
+    Sunblinds are selected by room, or listed by id, name or entity id.
+    """
+    topology = coordinator.topology
+    if (room := call.data.get(ATTR_ROOM)) is not None:
+        room = _resolve_unit(hass, coordinator, room, topology.rooms)
+        return [idx for idx in topology.sunblinds if idx.split("_")[0] == room]
+    if ALL_SUNBLINDS in call.data[ATTR_SUNBLINDS]:
+        return list(topology.sunblinds)
+    return [
+        _resolve_unit(hass, coordinator, item, topology.sunblinds)
+        for item in call.data[ATTR_SUNBLINDS]
+    ]
+
+
+async def _async_send_sunblinds(
+    coordinator: IqTecCoordinator,
+    sunblinds: list[str],
+    commands: Callable[[str, Sunblind], list[IqTecCommand]],
+) -> None:
+    """Send the commands of several sunblinds as one batch.
+
+    Unsent commands of the sunblinds are dropped first, as for single covers.
+    Staged moves of all sunblinds share their stop, read and step requests.
+    """
+    if (hub := coordinator.hub) is None:
+        raise HomeAssistantError("Controller has not been discovered yet")
+    for idx in sunblinds:
+        coordinator.commands.async_discard(idx)
+    await coordinator.commands.async_send(
+        *(command for idx in sunblinds for command in commands(idx, hub.sunblinds[idx]))
+    )
+
+
+async def _async_cover_group_command(call: ServiceCall) -> None:
+    """Open, close or stop several sunblinds at once."""
+    coordinator = _get_coordinator(call.hass, call)
+    value = COVER_COMMANDS[call.data[ATTR_COMMAND]]
+    await _async_send_sunblinds(
+        coordinator,
+        _get_sunblinds(call.hass, coordinator, call),
+        lambda _, sunblind: [IqTecCommand.unit_set(sunblind, "set_command", value)],
+    )
+
+
+async def _async_wait_settled(
+    coordinator: IqTecCoordinator, sunblinds: list[str]
+) -> None:
+    """Wait until moved sunblinds stopped.
+
+    Gives up after the longest travel and tilt time of the sunblinds.
+    """
+    hub, data = coordinator.hub, coordinator.data
+    units = [hub.sunblinds[idx] for idx in sunblinds]
+    timeout = REQUEST_TIMEOUT + max(
+        (data.sunblinds[idx].move_time or COVER_TRAVEL_TIME)
+        + data.sunblinds[idx].full_time_time / 1000
+        for idx in sunblinds
+    )
+    try:
+        async with asyncio.timeout(timeout):
+            while True:
+                status = await coordinator.client.async_fetch_units(units, [])
+                if not any(map(direction, status.sunblinds.values())):
+                    return
+                await asyncio.sleep(COVER_SETTLE_INTERVAL)
+    except TimeoutError:
+        raise HomeAssistantError("Sunblinds did not stop moving") from None
+    except ConnectionError as err:
+        raise HomeAssistantError(f"Reading sunblinds failed: {err}") from err
+
+
+async def _async_set_cover_positions(call: ServiceCall) -> None:
+    """Move several sunblinds to the same position and tilt at once.
+
+    All positions are sent as one batch. Sunblinds that support tilt are
+    tilted in a second batch, once the moved ones stopped.
+    """
+    coordinator = _get_coordinator(call.hass, call)
+    sunblinds = _get_sunblinds(call.hass, coordinator, call)
+    tilt_sunblinds = set(coordinator.topology.tilt_sunblinds)
+    if ATTR_POSITION in call.data:
+        position = sunblind_position(call.data[ATTR_POSITION])
+        await _async_send_sunblinds(
+            coordinator,
+            sunblinds,
+            lambda idx, sunblind: [
+                IqTecCommand.sunblind_move(
+                    sunblind, position=position, key=(idx, "position")
+                )
+            ],
+        )
+    tilted = [idx for idx in sunblinds if idx in tilt_sunblinds]
+    if ATTR_TILT_POSITION not in call.data or not tilted:
+        return
+    if ATTR_POSITION in call.data:
+        await _async_wait_settled(coordinator, tilted)
+    rotation = sunblind_rotation(call.data[ATTR_TILT_POSITION])
+    await _async_send_sunblinds(
+        coordinator,
+        tilted,
+        lambda idx, sunblind: [
+            IqTecCommand.sunblind_move(
+                sunblind, rotation=rotation, key=(idx, "rotation")
+            )
+        ],
+    )
+
+
+def _room_calls(
+    coordinator: IqTecCoordinator, settings: dict[str, Any]
+) -> dict[str, Any]:
+    """Return the room setter calls applying the settings of a room.
+
+    Settings apply in the order mode, preset, calendar and temperature, a
+    later setting overrides what an earlier one set.
+    """
+    calls: dict[str, Any] = {}
+    if (hvac_mode := settings.get(ATTR_HVAC_MODE)) is not None:
+        calls |= HVAC_MODE_CALLS[hvac_mode]
+    if (preset := settings.get(ATTR_PRESET_MODE)) is not None:
+        calls |= PRESET_CALLS[preset]
+    if (calendar := settings.get(ATTR_CALENDAR)) is not None:
+        calendars = coordinator.topology.calendars
+        number = next(
+            (n for n, name in calendars.items() if calendar in (n, name)), None
+        )
+        if number is None:
+            raise ServiceValidationError(f"Unknown calendar {calendar}")
+        calls |= calendar_calls(number)
+    if (temperature := settings.get(ATTR_TEMPERATURE)) is not None:
+        calls |= temperature_calls(temperature)
+    return calls
+
+
+async def _async_set_rooms(call: ServiceCall) -> None:
+    """Change the mode, preset, calendar and temperature of several rooms.
+
+    Everything is sent as one batch, the call returns once the controller
+    acknowledged it.
+    """
+    coordinator = _get_coordinator(call.hass, call)
+    rooms = {
+        _resolve_unit(call.hass, coordinator, item, coordinator.topology.rooms): (
+            _room_calls(coordinator, settings)
+        )
+        for item, settings in call.data[ATTR_ROOMS].items()
+    }
+    if (hub := coordinator.hub) is None:
+        raise HomeAssistantError("Controller has not been discovered yet")
+    await coordinator.commands.async_send(
+        *(
+            IqTecCommand.unit_set(hub.rooms[idx], setter, value)
+            for idx, calls in rooms.items()
+            for setter, value in calls.items()
+        )
+    )
+
+
+async def _async_read_apis(call: ServiceCall) -> ServiceResponse:
+    """Return the typed values of raw device APIs.
+
+    Values come from the snapshot, APIs that are not polled are fetched.
+    """
+    coordinator = _get_coordinator(call.hass, call)
+    apis = _resolve_apis(coordinator, call.data.get(ATTR_APIS))
+    return {"values": await coordinator.async_read_apis(apis)}
+
+
+async def _async_write_apis(call: ServiceCall) -> None:
+    """Write several raw device APIs at once.
+
+    Every value is checked against the typ of its API before anything is
+    sent, then all of them are sent as one request. Unsent commands of the
+    APIs are dropped first. The call returns once the controller
+    acknowledged them.
+    """
+    coordinator = _get_coordinator(call.hass, call)
+    if (hub := coordinator.hub) is None:
+        raise HomeAssistantError("Controller has not been discovered yet")
+    index = coordinator.index.apis
+    requests: dict[str, RequestSet] = {}
+    errors = []
+    for idx, value in call.data[ATTR_VALUES].items():
+        entry = index.get(idx)
+        device = hub.devices.get(entry.device) if entry is not None else None
+        if device is None or idx not in device.switch_apis:
+            errors.append(f"{idx} is not a writable API")
+            continue
+        try:
+            raw = API_VALUE_SCHEMAS[entry.typ](value)
+        except (vol.Invalid, ValueError):
+            errors.append(f"invalid {entry.typ} value {value!r} for {idx}")
+            continue
+        requests[idx] = device.switch_apis[idx].set_request(raw)
+    if errors:
+        raise ServiceValidationError(f"Cannot write APIs: {'; '.join(errors)}")
+    for idx in requests:
+        coordinator.commands.async_discard(idx)
+    await coordinator.commands.async_send(IqTecCommand.api_requests(requests))
+
+
+async def _async_output_path(
+    call: ServiceCall, coordinator: IqTecCoordinator, kind: str, extension: str
+) -> str:
+    """Return the path of a file written to the iqtec config folder."""
+    filename = call.data.get(
+        ATTR_FILENAME,
+        f"{kind}_{coordinator.config_entry.entry_id}_"
+        f"{dt_util.utcnow():%Y%m%d%H%M%S}.{extension}",
+    )
+    if os.path.basename(filename) != filename or filename.startswith("."):
+        raise ServiceValidationError(f"Invalid file name {filename}")
+    folder = call.hass.config.path(DOMAIN)
+    await call.hass.async_add_executor_job(os.makedirs, folder, 0o755, True)
+    return os.path.join(folder, filename)
+
+
+async def _async_start_recording(call: ServiceCall) -> ServiceResponse:
+    """Record the controller traffic to a file in the iqtec config folder."""
+    coordinator = _get_coordinator(call.hass, call)
+    path = await _async_output_path(call, coordinator, "recording", "jsonl.gz")
+    coordinator.async_start_recording(path)
+    return {"path": path}
+
+
+async def _async_stop_recording(call: ServiceCall) -> ServiceResponse:
+    """Stop recording and return the recording file."""
+    coordinator = _get_coordinator(call.hass, call)
+    if (recorder := await coordinator.async_stop_recording()) is None:
+        raise ServiceValidationError("Not recording")
+    return {"path": recorder.path, "records": recorder.records}
+
+
+async def _async_profile(call: ServiceCall) -> ServiceResponse:
+    """Profile the next update cycles to a file in the iqtec config folder."""
+    coordinator = _get_coordinator(call.hass, call)
+    path = await _async_output_path(call, coordinator, "profile", "prof")
+    return await coordinator.async_profile(path, call.data[ATTR_CYCLES])
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_COVER_GROUP_COMMAND,
+        _async_cover_group_command,
+        schema=COVER_GROUP_COMMAND_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_COVER_POSITIONS,
+        _async_set_cover_positions,
+        schema=SET_COVER_POSITIONS_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_ROOMS,
+        _async_set_rooms,
+        schema=SET_ROOMS_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_READ_APIS,
+        _async_read_apis,
+        schema=READ_APIS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_WRITE_APIS,
+        _async_write_apis,
+        schema=WRITE_APIS_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        _async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_RECORDING,
+        _async_start_recording,
+        schema=START_RECORDING_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_RECORDING,
+        _async_stop_recording,
+        schema=_ENTRY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -1,18 +1,15 @@
 """IQtec Switch."""
 
-import logging
 from typing import Any
 
 from homeassistant.components.switch import SwitchDeviceClass, SwitchEntity
-from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
-from .const import DOMAIN, MANUAL_SWITCHES
-from .coordinator import IqTecConfigEntry, IqTecCoordinator
-from .entity import IqTecEntity
-
-_LOGGER = logging.getLogger(__name__)
+from .commands import IqTecCommand
+from .coordinator import IqTecConfigEntry
+from .entity import IqTecApiEntity
 
 
 async def async_setup_entry(
@@ -22,64 +19,33 @@ async def async_setup_entry(
 ) -> None:
     """Setup Switch entries."""
     coordinator = config_entry.runtime_data.coordinator
-
-    switches = []
-    for d_idx, d in coordinator.hub.devices.items():
-        for idx, a in d.switch_apis.items():
-            if a.typ in {"OnOff", "bool"}:
-                switches.append(IqTecSwitch(coordinator, idx, d_idx))
-    switches.extend(
-        IqTecSwitch(coordinator, sw, sw.split(".", maxsplit=1)[0])
-        for sw in MANUAL_SWITCHES
+    async_add_entities(
+        IqTecSwitch(coordinator, api) for api in coordinator.index.get(Platform.SWITCH)
     )
-    async_add_entities(switches)
 
 
-class IqTecSwitch(IqTecEntity, SwitchEntity):
+class IqTecSwitch(IqTecApiEntity, SwitchEntity):
     """IQtec Switch Entity."""
 
-    def __init__(self, coordinator: IqTecCoordinator, idx: str, device: str) -> None:
-        """Initialise IQtec Switch."""
-        super().__init__(coordinator, idx)
-        self._device_idx = device
-        self._val_idx = idx.split(".")[1]
-
-        self.entity_registry_visible_default = False
-
-        self._attr_device_info = self._default_device_info | DeviceInfo(
-            identifiers={(DOMAIN, device)}, name=f"_{device}"
-        )
-
     device_class = SwitchDeviceClass.SWITCH
 
-    @property
-    def name(self) -> str:
-        """Return the entity name."""
-        return self.idx
-
-    @property
-    def extra_state_attributes(self) -> dict[str, str]:
-        """Returns raw iqtec state attributes."""
-        return {}
-
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        val = self.coordinator.data.devices[self._device_idx].switches[self.idx]
-        if "!" not in val:
-            self._attr_is_on = bool(int(val))
-        _LOGGER.debug("Updating device: %s", self.idx)
-        self.async_write_ha_state()
+    def _update_value(self, value: bool) -> None:
+        """Apply a decoded value."""
+        self._attr_is_on = value
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the entity on."""
-        r = self._hub.devices[self._device_idx].switch_apis[self.idx].set_request("1")
-        self.hass.async_add_executor_job(self._hub.api_call, r)
+        await self._commands.async_send(
+            IqTecCommand.api_request(self.idx, self._set_request("1"))
+        )
+        self._async_set_optimistic(True)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the entity off."""
-        r = self._hub.devices[self._device_idx].switch_apis[self.idx].set_request("0")
-        self.hass.async_add_executor_job(self._hub.api_call, r)
+        await self._commands.async_send(
+            IqTecCommand.api_request(self.idx, self._set_request("0"))
+        )
+        self._async_set_optimistic(False)
 
     async def async_toggle(self, **kwargs: Any) -> None:
         """Toggle the entity."""
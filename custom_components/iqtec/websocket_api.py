@@ -0,0 +1,87 @@
+"""Websocket API of the IQtec integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .coordinator import IqTecConfigEntry
+
+
+@callback
+def async_setup_websocket_api(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, websocket_subscribe_apis)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe_apis",
+        vol.Required("entry_id"): str,
+        vol.Optional("apis"): [str],
+    }
+)
+@callback
+def websocket_subscribe_apis(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Subscribe to raw device API values.
+
+    The subscribed APIs are polled while the subscription lasts. The first
+    event holds all values, later events only the values that changed.
+    """
+    entry: IqTecConfigEntry | None = hass.config_entries.async_get_entry(
+        msg["entry_id"]
+    )
+    if (
+        entry is None
+        or entry.domain != DOMAIN
+        or entry.state is not ConfigEntryState.LOADED
+    ):
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Config entry not found"
+        )
+        return
+    coordinator = entry.runtime_data.coordinator
+    apis = msg.get("apis", list(coordinator.index.apis))
+    if unknown := [idx for idx in apis if idx not in coordinator.index.apis]:
+        connection.send_error(
+            msg["id"],
+            websocket_api.ERR_INVALID_FORMAT,
+            f"Unknown APIs {', '.join(unknown)}",
+        )
+        return
+
+    sent: dict[str, Any] = {}
+
+    @callback
+    def _async_forward() -> None:
+        values = coordinator.api_values(apis)
+        changed = {
+            idx: value
+            for idx, value in values.items()
+            if idx not in sent or sent[idx] != value
+        }
+        if changed:
+            sent.update(changed)
+            connection.send_message(
+                websocket_api.event_message(msg["id"], {"values": changed})
+            )
+
+    unsub_apis = coordinator.async_subscribe_apis(apis)
+    unsub_listener = coordinator.async_add_listener(_async_forward)
+
+    @callback
+    def _async_unsubscribe() -> None:
+        unsub_listener()
+        unsub_apis()
+
+    connection.subscriptions[msg["id"]] = _async_unsubscribe
+    connection.send_result(msg["id"])
+    _async_forward()
@@ -0,0 +1,37 @@
+"""Helpers shared by the tests."""
+
+from __future__ import annotations
+
+from dataclasses import fields
+from typing import Any
+
+from piqtec.unit.sunblind import SunblindState
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.iqtec.const import DOMAIN
+from homeassistant.core import HomeAssistant
+
+from benchmarks.fake_controller import FakeController
+
+
+def sunblind_state(**values: Any) -> SunblindState:
+    """Return a standing sunblind state with the given values."""
+    state = {f.name: 0 for f in fields(SunblindState)} | {"name": "Sunblind"}
+    return SunblindState(**state | values)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, controller: FakeController, **options: Any
+) -> MockConfigEntry:
+    """Set up a config entry of a simulated controller, polled by the test."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": controller.host, "cover_use_short_tilt": False},
+        options=options,
+        unique_id=f"iqtec_{controller.host}",
+        pref_disable_polling=True,
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done(wait_background_tasks=True)
+    return entry
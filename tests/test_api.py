@@ -0,0 +1,91 @@
+"""Tests of the decoded API values and the status snapshots."""
+
+from __future__ import annotations
+
+from custom_components.iqtec.api import IqTecApiValues, IqTecStatus
+
+from .common import sunblind_state
+
+SLOTS = {"D0.SWITCH0": 0, "D0.SENSOR1": 1, "D0.SENSOR3": 2}
+
+
+def test_decode_values() -> None:
+    """Numbers are decoded, errors and missing APIs are invalid."""
+    values = IqTecApiValues.decode(
+        SLOTS, {"D0.SWITCH0": "1", "D0.SENSOR1": "!", "D1.SWITCH0": "3"}
+    )
+    assert values.get(0) == 1.0
+    assert values.get(1) is None
+    assert values.get(2) is None
+    assert values.get(3) is None
+
+
+def test_decode_invalid_values() -> None:
+    """Values that are not numbers or not reported are invalid."""
+    values = IqTecApiValues.decode(SLOTS, {"D0.SWITCH0": "auto", "D0.SENSOR1": None})
+    assert values.get(0) is None
+    assert values.get(1) is None
+
+
+def test_updated_values_are_a_copy() -> None:
+    """Updating returns new columns and keeps the original ones."""
+    values = IqTecApiValues.decode(SLOTS, {"D0.SWITCH0": "1", "D0.SENSOR1": "2.5"})
+    updated = values.updated(SLOTS, {"D0.SWITCH0": "0", "D0.SENSOR1": "!"})
+    assert (updated.get(0), updated.get(1)) == (0.0, None)
+    assert (values.get(0), values.get(1)) == (1.0, 2.5)
+
+
+def test_updated_values_ignore_new_slots() -> None:
+    """Slots added after the values were decoded are left invalid."""
+    values = IqTecApiValues.decode({"D0.SWITCH0": 0}, {"D0.SWITCH0": "1"})
+    updated = values.updated(SLOTS, {"D0.SENSOR1": "2"})
+    assert updated.get(0) == 1.0
+    assert updated.get(1) is None
+
+
+def test_merge_shares_tables_without_updates() -> None:
+    """Only the tables of the partial status are copied."""
+    status = IqTecStatus(
+        sunblinds={"S0": sunblind_state(), "S1": sunblind_state()},
+        apis={"D0.SWITCH0": "1"},
+        api_values=IqTecApiValues.decode(SLOTS, {"D0.SWITCH0": "1"}),
+    )
+    moved = sunblind_state(position=500)
+    merged = status.merge(IqTecStatus(sunblinds={"S1": moved}), SLOTS)
+    assert merged.sunblinds == {"S0": status.sunblinds["S0"], "S1": moved}
+    assert status.sunblinds["S1"] is not moved
+    assert merged.rooms is status.rooms
+    assert merged.apis is status.apis
+    assert merged.api_values is status.api_values
+
+
+def test_merge_decodes_updated_apis() -> None:
+    """Merged APIs are decoded into a copy of the values."""
+    status = IqTecStatus(
+        apis={"D0.SWITCH0": "1", "D0.SENSOR1": "2"},
+        api_values=IqTecApiValues.decode(SLOTS, {"D0.SWITCH0": "1", "D0.SENSOR1": "2"}),
+    )
+    merged = status.merge(IqTecStatus(apis={"D0.SWITCH0": "0"}), SLOTS)
+    assert merged.apis == {"D0.SWITCH0": "0", "D0.SENSOR1": "2"}
+    assert (merged.api_values.get(0), merged.api_values.get(1)) == (0.0, 2.0)
+    assert status.api_values.get(0) == 1.0
+
+
+def test_changed() -> None:
+    """Ids with a new or different value are changed."""
+    previous = IqTecStatus(
+        sunblinds={"S0": sunblind_state(), "S1": sunblind_state()},
+        apis={"D0.SWITCH0": "1", "D0.SENSOR1": "2"},
+    )
+    status = IqTecStatus(
+        sunblinds={"S0": sunblind_state(), "S1": sunblind_state(rotation=90)},
+        apis={"D0.SWITCH0": "1", "D0.SENSOR1": "3", "D0.SENSOR3": "0"},
+    )
+    assert status.changed(previous) == {"S1", "D0.SENSOR1", "D0.SENSOR3"}
+
+
+def test_changed_skips_shared_tables() -> None:
+    """Tables shared with the previous snapshot are not compared."""
+    previous = IqTecStatus(apis={"D0.SWITCH0": "1"})
+    merged = previous.merge(IqTecStatus(sunblinds={"S0": sunblind_state()}), SLOTS)
+    assert merged.changed(previous) == {"S0"}
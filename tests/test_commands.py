@@ -0,0 +1,154 @@
+"""Tests of the command queue."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Sequence
+
+from piqtec.type_helpers import RequestSet, Set
+import pytest
+
+from custom_components.iqtec.commands import (
+    CommandFailed,
+    IqTecCommand,
+    IqTecCommandQueue,
+)
+from custom_components.iqtec.metrics import IqTecMetrics
+from homeassistant.core import HomeAssistant
+
+DEBOUNCE_WINDOW = 0.01
+
+
+class _Client:
+    """Records the batches the queue sends."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[IqTecCommand]] = []
+        self.error: Exception | None = None
+
+    async def async_execute(self, commands: Sequence[IqTecCommand]) -> None:
+        if self.error is not None:
+            raise self.error
+        self.batches.append(list(commands))
+
+
+def _write(idx: str, value: str, keyed: bool = True) -> IqTecCommand:
+    return IqTecCommand.api_request(
+        idx,
+        RequestSet(setters=[Set(idx, value)]),
+        key=(idx, "value") if keyed else None,
+    )
+
+
+def _staged(unit: object) -> IqTecCommand:
+    return IqTecCommand(
+        stop=RequestSet(), build=lambda _: RequestSet(), unit=unit, unit_type="unit"
+    )
+
+
+def _values(batch: list[IqTecCommand]) -> list[str]:
+    return [s.value for c in batch for s in c.request.setters]
+
+
+@pytest.fixture
+def client() -> _Client:
+    """Return the client the queue sends to."""
+    return _Client()
+
+
+@pytest.fixture
+def metrics() -> IqTecMetrics:
+    """Return the statistics of the queue."""
+    return IqTecMetrics()
+
+
+@pytest.fixture
+def queue(
+    hass: HomeAssistant, client: _Client, metrics: IqTecMetrics
+) -> IqTecCommandQueue:
+    """Return a queue with a short debounce window."""
+    return IqTecCommandQueue(hass, client, DEBOUNCE_WINDOW, metrics)
+
+
+async def test_one_batch_per_iteration(
+    queue: IqTecCommandQueue, client: _Client
+) -> None:
+    """Commands queued together are sent as one batch, in order."""
+    await queue.async_send(_write("D0.SWITCH0", "1"), _write("D0.SWITCH2", "0"))
+    await queue.async_send(_write("D0.SWITCH0", "0"))
+    assert [_values(b) for b in client.batches] == [["1", "0"], ["0"]]
+
+
+async def test_keyed_command_supersedes_queued(
+    queue: IqTecCommandQueue, client: _Client
+) -> None:
+    """A keyed command replaces an unsent command with the same key."""
+    await asyncio.gather(
+        queue.async_send(_write("D0.SWITCH0", "1")),
+        queue.async_send(_write("D0.SWITCH0", "0")),
+        queue.async_send(_write("D0.SWITCH0", "2", keyed=False)),
+    )
+    assert [_values(b) for b in client.batches] == [["0", "2"]]
+
+
+async def test_debounce_sends_latest(queue: IqTecCommandQueue, client: _Client) -> None:
+    """Only the last keyed command of a debounce window is sent."""
+    results = await asyncio.gather(
+        queue.async_send_latest(_write("D0.SWITCH4", "20")),
+        queue.async_send_latest(_write("D0.SWITCH4", "21")),
+        queue.async_send_latest(_write("D0.SWITCH6", "5")),
+    )
+    assert results == [False, True, True]
+    assert [_values(b) for b in client.batches] == [["21", "5"]]
+
+
+async def test_debounce_restarts_window(
+    queue: IqTecCommandQueue, client: _Client
+) -> None:
+    """A superseding command waits for a full window of its own."""
+    first = asyncio.ensure_future(queue.async_send_latest(_write("D0.SWITCH4", "20")))
+    await asyncio.sleep(DEBOUNCE_WINDOW / 2)
+    second = asyncio.ensure_future(queue.async_send_latest(_write("D0.SWITCH4", "21")))
+    assert await first is False
+    assert client.batches == []
+    assert await second is True
+    assert [_values(b) for b in client.batches] == [["21"]]
+
+
+async def test_without_debounce(hass: HomeAssistant, client: _Client) -> None:
+    """Without a debounce window keyed commands are queued at once."""
+    queue = IqTecCommandQueue(hass, client, 0, IqTecMetrics())
+    assert await queue.async_send_latest(_write("D0.SWITCH4", "20")) is True
+    assert [_values(b) for b in client.batches] == [["20"]]
+
+
+async def test_discard(queue: IqTecCommandQueue, client: _Client) -> None:
+    """Discarding drops the unsent keyed commands of a unit."""
+    debounced = asyncio.ensure_future(
+        queue.async_send_latest(_write("D0.SWITCH4", "20"))
+    )
+    await asyncio.sleep(0)
+    queue.async_discard("D0.SWITCH4")
+    assert await debounced is False
+    await queue.async_send(_write("D0.SWITCH0", "1"))
+    assert [_values(b) for b in client.batches] == [["1"]]
+
+
+async def test_second_staged_command_waits(
+    queue: IqTecCommandQueue, client: _Client
+) -> None:
+    """A second staged command of a unit is sent in the next batch."""
+    unit, other = object(), object()
+    first, second, third = _staged(unit), _staged(other), _staged(unit)
+    await queue.async_send(first, second, third)
+    assert client.batches == [[first, second], [third]]
+
+
+async def test_failure(
+    queue: IqTecCommandQueue, client: _Client, metrics: IqTecMetrics
+) -> None:
+    """Errors of the client fail the waiting commands and are counted."""
+    client.error = ConnectionError("unreachable")
+    with pytest.raises(CommandFailed):
+        await queue.async_send(_write("D0.SWITCH0", "1"))
+    assert metrics.errors == {"command_error": 1}
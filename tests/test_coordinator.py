@@ -0,0 +1,115 @@
+"""Tests of the IQtec coordinator."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.iqtec.const import (
+    CONF_API_INTERVAL,
+    CONF_ROOM_INTERVAL,
+    MAX_CONCURRENT_REQUESTS,
+    TIER_APIS,
+    TIER_ROOMS,
+)
+from homeassistant.core import HomeAssistant
+
+from benchmarks.fake_controller import FakeController
+
+from .common import async_setup_entry
+
+# Every poll refreshes every tier
+POLL_ALL = {CONF_ROOM_INTERVAL: 0, CONF_API_INTERVAL: 0}
+
+
+@pytest.mark.parametrize("fake_controller", [(20, 20, 25)], indirect=True)
+async def test_requests_in_flight(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """Polls, refreshes and reads share a few requests to the controller."""
+    entry = await async_setup_entry(hass, fake_controller, **POLL_ALL)
+    coordinator = entry.runtime_data.coordinator
+    hub = coordinator.hub
+    fake_controller.delay = 0.01
+    await asyncio.gather(
+        coordinator.async_refresh(),
+        coordinator.client.async_fetch_units(list(hub.rooms.values()), []),
+        coordinator.async_read_apis(["D0.SWITCH0"]),
+    )
+    assert 1 < fake_controller.max_in_flight <= MAX_CONCURRENT_REQUESTS
+    assert coordinator.last_update_success
+
+
+async def test_overlapping_refresh_joined(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """A refresh requested while another one runs joins it and is counted."""
+    entry = await async_setup_entry(hass, fake_controller, **POLL_ALL)
+    coordinator = entry.runtime_data.coordinator
+    fake_controller.delay = 0.01
+    requests = fake_controller.requests
+    await coordinator.async_refresh()
+    poll = fake_controller.requests - requests
+    await asyncio.gather(coordinator.async_refresh(), coordinator.async_refresh())
+    assert coordinator.skipped_polls == 1
+    assert fake_controller.requests - requests == 2 * poll
+    assert coordinator.last_update_success
+
+
+async def test_polls_not_skipped(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """Polls following each other are not counted as skipped."""
+    entry = await async_setup_entry(hass, fake_controller, **POLL_ALL)
+    coordinator = entry.runtime_data.coordinator
+    for _ in range(3):
+        await coordinator.async_refresh()
+    await coordinator.async_read_apis(["D0.SWITCH0"])
+    assert coordinator.skipped_polls == 0
+
+
+async def test_tiers_polled_at_their_interval(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """Rooms and APIs are only refetched once their interval passed."""
+    entry = await async_setup_entry(hass, fake_controller)
+    coordinator = entry.runtime_data.coordinator
+    data = coordinator.data
+    fake_controller.churn(1)
+    await coordinator.async_refresh()
+    assert coordinator.data.rooms is data.rooms
+    assert coordinator.data.apis is data.apis
+    assert coordinator.data.sunblinds is not data.sunblinds
+    coordinator.async_mark_due(TIER_ROOMS, TIER_APIS)
+    await coordinator.async_refresh()
+    assert coordinator.data.rooms != data.rooms
+    assert coordinator.data.apis != data.apis
+
+
+async def test_command_refreshes_its_unit(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """A command refreshes the unit it wrote rather than a whole tier."""
+    entry = await async_setup_entry(hass, fake_controller)
+    coordinator = entry.runtime_data.coordinator
+    client = coordinator.client
+    with (
+        patch.object(client, "async_fetch", wraps=client.async_fetch) as fetch,
+        patch.object(
+            client, "async_fetch_units", wraps=client.async_fetch_units
+        ) as fetch_units,
+    ):
+        await hass.services.async_call(
+            "climate",
+            "set_temperature",
+            {"entity_id": "climate.room_0", "temperature": 23.5},
+            blocking=True,
+        )
+        await hass.async_block_till_done(wait_background_tasks=True)
+    fetch.assert_not_called()
+    fetch_units.assert_awaited_once_with(
+        [coordinator.hub.rooms[fake_controller.rooms[0]]], []
+    )
+    assert hass.states.get("climate.room_0").attributes["temperature"] == 23.5
@@ -0,0 +1,81 @@
+"""Tests of the deadband filtering."""
+
+from __future__ import annotations
+
+import pytest
+import voluptuous as vol
+
+from custom_components.iqtec.const import (
+    CONF_DEADBAND_FLOAT,
+    CONF_DEADBAND_SHORT,
+    CONF_DEADBAND_TEMPERATURE,
+    CONF_HEARTBEAT,
+    DEFAULT_HEARTBEAT,
+)
+from custom_components.iqtec.deadband import IqTecDeadband, parse_deadband
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (0.05, (0.05, False)),
+        ("0.2", (0.2, False)),
+        ("2%", (2.0, True)),
+        (" 1.5 % ", (1.5, True)),
+        ("", (0.0, False)),
+    ],
+)
+def test_parse_deadband(value: object, expected: tuple[float, bool]) -> None:
+    """Absolute and relative deadbands are parsed."""
+    assert parse_deadband(value) == expected
+
+
+@pytest.mark.parametrize("value", ["abc", "-1", "-2%", "%%"])
+def test_parse_invalid_deadband(value: str) -> None:
+    """Negative and malformed deadbands are rejected."""
+    with pytest.raises(vol.Invalid):
+        parse_deadband(value)
+
+
+def test_from_options() -> None:
+    """Deadbands are created for the configured types only."""
+    deadbands = IqTecDeadband.from_options(
+        {
+            CONF_DEADBAND_TEMPERATURE: "0.1",
+            CONF_DEADBAND_FLOAT: "5%",
+            CONF_DEADBAND_SHORT: "0",
+            CONF_HEARTBEAT: 60.0,
+        }
+    )
+    assert deadbands == {
+        "Temperature": IqTecDeadband(0.1, False, 60.0),
+        "float": IqTecDeadband(5.0, True, 60.0),
+    }
+    assert IqTecDeadband.from_options({}) == {}
+
+
+def test_within_absolute() -> None:
+    """Changes smaller than an absolute threshold are within it."""
+    deadband = IqTecDeadband(0.5)
+    assert deadband.heartbeat == DEFAULT_HEARTBEAT
+    assert deadband.within(20.0, 20.4)
+    assert deadband.within(20.0, 19.6)
+    assert not deadband.within(20.0, 20.5)
+    assert not deadband.within(20.0, 19.0)
+
+
+def test_within_relative() -> None:
+    """Relative thresholds scale with the old value."""
+    deadband = IqTecDeadband(10, relative=True)
+    assert deadband.within(200.0, 219.0)
+    assert not deadband.within(200.0, 220.0)
+    assert deadband.within(-200.0, -181.0)
+    assert not deadband.within(0.0, 0.1)
+
+
+def test_within_missing_values() -> None:
+    """A value becoming or ending invalid is always written."""
+    deadband = IqTecDeadband(0.5)
+    assert deadband.within(None, None)
+    assert not deadband.within(None, 20.0)
+    assert not deadband.within(20.0, None)
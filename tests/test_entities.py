@@ -0,0 +1,66 @@
+"""Tests of the IQtec entities."""
+
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.iqtec.const import CONF_DEBOUNCE_WINDOW
+from homeassistant.core import Event, EventStateChangedData, HomeAssistant
+
+from benchmarks.fake_controller import FakeController
+
+from .common import async_setup_entry
+
+
+async def test_number_normalized_echo(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """A controller formatting written numbers its own way accepts them."""
+    fake_controller.normalize = True
+    entry = await async_setup_entry(hass, fake_controller, **{CONF_DEBOUNCE_WINDOW: 0})
+    await hass.services.async_call(
+        "number",
+        "set_value",
+        {"entity_id": "number.d0_switch4", "value": 21.5},
+        blocking=True,
+    )
+    await hass.services.async_call(
+        "number",
+        "set_value",
+        {"entity_id": "number.d0_switch6", "value": 5},
+        blocking=True,
+    )
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert hass.states.get("number.d0_switch4").state == "21.5"
+    assert hass.states.get("number.d0_switch6").state == "5.0"
+    assert entry.runtime_data.coordinator.metrics.errors == {}
+
+
+async def test_optimistic_value_of_sent_command(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """Only the value actually sent is shown before the controller reports it."""
+    await async_setup_entry(hass, fake_controller)
+    shown = []
+
+    def _state_changed(event: Event[EventStateChangedData]) -> None:
+        if event.data["entity_id"] == "number.d0_switch4":
+            shown.append(event.data["new_state"].state)
+
+    hass.bus.async_listen("state_changed", _state_changed)
+    await asyncio.gather(
+        *(
+            hass.services.async_call(
+                "number",
+                "set_value",
+                {"entity_id": "number.d0_switch4", "value": value},
+                blocking=True,
+            )
+            for value in (18, 22.5)
+        )
+    )
+    # Shown before the refresh after the command confirmed it
+    assert hass.states.get("number.d0_switch4").state == "22.5"
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert hass.states.get("number.d0_switch4").state == "22.5"
+    assert "18.0" not in shown
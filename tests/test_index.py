@@ -0,0 +1,87 @@
+"""Tests of the entity index."""
+
+from __future__ import annotations
+
+from custom_components.iqtec.api import IqTecApiValues
+from custom_components.iqtec.const import MANUAL_SWITCHES
+from custom_components.iqtec.discovery import IqTecTopology
+from custom_components.iqtec.index import IqTecEntityIndex
+from homeassistant.const import Platform
+
+TOPOLOGY = IqTecTopology(
+    name="IQtec",
+    switch_apis={
+        "D0.SWITCH0": "OnOff",
+        "D0.SWITCH2": "OnOffAuto",
+        "D0.SWITCH4": "Temperature",
+        "D0.SWITCH6": "string",
+    },
+    sensor_apis={"D0.SENSOR1": "bool", "D0.SENSOR3": "short"},
+)
+
+
+def _ids(index: IqTecEntityIndex, platform: Platform) -> list[str]:
+    return [entry.idx for entry in index.get(platform)]
+
+
+def test_platforms() -> None:
+    """APIs are listed under the platform of their typ."""
+    index = IqTecEntityIndex.from_topology(TOPOLOGY)
+    assert _ids(index, Platform.SWITCH) == ["D0.SWITCH0", *MANUAL_SWITCHES]
+    assert _ids(index, Platform.SELECT) == ["D0.SWITCH2"]
+    assert _ids(index, Platform.NUMBER) == ["D0.SWITCH4"]
+    assert _ids(index, Platform.BINARY_SENSOR) == ["D0.SENSOR1"]
+    assert _ids(index, Platform.SENSOR) == ["D0.SENSOR3"]
+    assert index.get(Platform.COVER) == []
+    assert "D0.SWITCH6" not in index.apis
+
+
+def test_entries() -> None:
+    """Entries split the API id and get a slot of their own."""
+    index = IqTecEntityIndex.from_topology(TOPOLOGY)
+    entry = index.apis["D0.SWITCH4"]
+    assert (entry.device, entry.key, entry.typ) == ("D0", "SWITCH4", "Temperature")
+    assert sorted(index.slots.values()) == list(range(len(index.apis)))
+    assert all(index.slots[idx] == e.slot for idx, e in index.apis.items())
+
+
+def test_without_raw_entities() -> None:
+    """Without raw entities the APIs are indexed, only manual switches listed."""
+    index = IqTecEntityIndex.from_topology(TOPOLOGY, raw_entities=False)
+    assert index.platforms == {Platform.SWITCH: index.get(Platform.SWITCH)}
+    assert _ids(index, Platform.SWITCH) == MANUAL_SWITCHES
+    assert "D0.SENSOR3" in index.apis
+
+
+def test_add_keeps_slot() -> None:
+    """Adding an API again keeps its slot."""
+    index = IqTecEntityIndex()
+    index.add(Platform.SENSOR, "D0.SENSOR1", "float", float)
+    index.add(Platform.SENSOR, "D0.SENSOR3", "float", float)
+    index.add(Platform.SWITCH, "D0.SENSOR1", "bool", bool)
+    assert index.slots == {"D0.SENSOR1": 0, "D0.SENSOR3": 1}
+    assert index.apis["D0.SENSOR1"].typ == "bool"
+
+
+def test_decode() -> None:
+    """Entries decode their typed value from a snapshot."""
+    index = IqTecEntityIndex.from_topology(TOPOLOGY)
+    values = IqTecApiValues.decode(
+        index.slots,
+        {
+            "D0.SWITCH0": "1",
+            "D0.SWITCH2": "2",
+            "D0.SWITCH4": "21.5",
+            "D0.SENSOR1": "0",
+            "D0.SENSOR3": "!",
+        },
+    )
+    decoded = {idx: entry.decode(values) for idx, entry in index.apis.items()}
+    assert decoded == {
+        "D0.SWITCH0": True,
+        "D0.SWITCH2": "auto",
+        "D0.SWITCH4": 21.5,
+        "D0.SENSOR1": False,
+        "D0.SENSOR3": None,
+        "SYSTEM.SET_HEAT": None,
+    }
@@ -0,0 +1,63 @@
+"""Tests of setting up IQtec config entries."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from piqtec.controller import Controller
+from requests import ConnectionError as RequestsConnectionError
+
+from custom_components.iqtec.const import DOMAIN
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from benchmarks.fake_controller import FakeController
+
+from .common import async_setup_entry
+
+
+async def test_cached_setup_retries_discovery(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """A controller offline at startup is discovered once it is back."""
+    entry = await async_setup_entry(hass, fake_controller)
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+    attempts = []
+
+    def _controller(host: str) -> Controller:
+        attempts.append(host)
+        if len(attempts) == 1:
+            raise RequestsConnectionError("Connection refused")
+        return Controller(host)
+
+    with (
+        patch("custom_components.iqtec.discovery.Controller", _controller),
+        patch("custom_components.iqtec.backoff_delay", return_value=0),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        assert entry.state is ConfigEntryState.LOADED
+        await hass.async_block_till_done(wait_background_tasks=True)
+
+    coordinator = entry.runtime_data.coordinator
+    assert len(attempts) == 2
+    assert coordinator.hub is not None
+    assert coordinator.data is not None
+    assert hass.states.get("climate.room_0").state != "unavailable"
+
+
+async def test_flow_cannot_connect(hass: HomeAssistant) -> None:
+    """Request errors of the enumeration are shown as connection errors."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": "user"}
+    )
+    with patch(
+        "custom_components.iqtec.discovery.Controller",
+        side_effect=RequestsConnectionError("Connection refused"),
+    ):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {"host": "127.0.0.1:1", "cover_use_short_tilt": False}
+        )
+    assert result["type"] is FlowResultType.FORM
+    assert result["errors"] == {"base": "cannot_connect"}
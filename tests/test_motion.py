@@ -0,0 +1,103 @@
+"""Tests of the sunblind motion model."""
+
+from __future__ import annotations
+
+from piqtec.constants import SUNBLIND_EXTENDED, SUNBLIND_TILT_CLOSED
+import pytest
+
+from custom_components.iqtec.const import COVER_TRAVEL_TIME
+from custom_components.iqtec.motion import (
+    SPEED_SMOOTHING,
+    IqTecCoverMotion,
+    direction,
+)
+
+from .common import sunblind_state
+
+
+@pytest.mark.parametrize(
+    ("outputs", "expected"),
+    [
+        ({}, 0),
+        ({"out_dn_1": True}, 1),
+        ({"out_dn_2": True}, 1),
+        ({"out_up_1": True}, -1),
+        ({"out_up_2": True}, -1),
+    ],
+)
+def test_direction(outputs: dict[str, bool], expected: int) -> None:
+    """The direction follows the outputs driving the motor."""
+    assert direction(sunblind_state(**outputs)) == expected
+
+
+def test_speed_from_move_time() -> None:
+    """The first state sets the speed from the configured move time."""
+    motion = IqTecCoverMotion()
+    motion.update(sunblind_state(move_time=50), 0.0)
+    assert motion.speed == SUNBLIND_EXTENDED / 50
+
+
+def test_speed_without_move_time() -> None:
+    """Without a move time the default travel time is assumed."""
+    motion = IqTecCoverMotion()
+    motion.update(sunblind_state(move_time=0), 0.0)
+    assert motion.speed == SUNBLIND_EXTENDED / COVER_TRAVEL_TIME
+
+
+def test_speed_observed() -> None:
+    """The speed follows the position changes of a moving sunblind."""
+    motion = IqTecCoverMotion()
+    motion.update(sunblind_state(move_time=50, out_dn_1=True, position=100), 0.0)
+    motion.update(sunblind_state(move_time=50, out_dn_1=True, position=150), 1.0)
+    assert motion.speed == pytest.approx(20 + SPEED_SMOOTHING * (50 - 20))
+
+
+def test_speed_not_observed_on_reversal() -> None:
+    """Positions reported in different directions leave the speed unchanged."""
+    motion = IqTecCoverMotion()
+    motion.update(sunblind_state(move_time=50, out_dn_1=True, position=100), 0.0)
+    motion.update(sunblind_state(move_time=50, out_up_1=True, position=400), 1.0)
+    assert motion.speed == 20
+
+
+def test_estimate_standing() -> None:
+    """A standing sunblind stays where it was reported."""
+    motion = IqTecCoverMotion()
+    motion.update(sunblind_state(position=300, rotation=45), 0.0)
+    assert motion.estimate(10.0) == (300, 45)
+
+
+def test_estimate_travel() -> None:
+    """A sunblind without tilt travels at its speed up to the end."""
+    motion = IqTecCoverMotion()
+    motion.update(sunblind_state(move_time=50, out_dn_1=True, position=100), 0.0)
+    assert motion.estimate(2.0) == (140, 0)
+    assert motion.estimate(100.0) == (SUNBLIND_EXTENDED, 0)
+
+
+def test_estimate_tilt_first() -> None:
+    """A moving sunblind tilts fully before it travels."""
+    motion = IqTecCoverMotion()
+    motion.update(
+        sunblind_state(move_time=50, full_time_time=1800, out_dn_1=True, position=100),
+        0.0,
+    )
+    assert motion.estimate(0.9) == (100, SUNBLIND_TILT_CLOSED // 2)
+    assert motion.estimate(2.8) == (120, SUNBLIND_TILT_CLOSED)
+
+
+def test_estimate_opening() -> None:
+    """An opening sunblind tilts open, then travels up to the top."""
+    motion = IqTecCoverMotion()
+    motion.update(
+        sunblind_state(
+            move_time=50,
+            full_time_time=1800,
+            out_up_1=True,
+            position=100,
+            rotation=SUNBLIND_TILT_CLOSED,
+        ),
+        0.0,
+    )
+    assert motion.estimate(1.8) == (100, 0)
+    assert motion.estimate(30.0) == (0, 0)
@@ -0,0 +1,64 @@
+"""Tests of recording and replaying controller traffic."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.iqtec.const import CONF_API_INTERVAL, CONF_ROOM_INTERVAL, DOMAIN
+from custom_components.iqtec.replay import IqTecRecording, IqTecReplayClient
+from homeassistant.core import HomeAssistant
+
+from benchmarks.fake_controller import FakeController
+
+from .common import async_setup_entry
+
+POLLS = 3
+
+
+async def test_replay_default_intervals(
+    hass: HomeAssistant, fake_controller: FakeController, tmp_path: Path
+) -> None:
+    """Replayed records refresh their tiers, whatever the tier intervals."""
+    path = str(tmp_path / "recording.jsonl.gz")
+    entry = await async_setup_entry(
+        hass, fake_controller, **{CONF_ROOM_INTERVAL: 0, CONF_API_INTERVAL: 0}
+    )
+    coordinator = entry.runtime_data.coordinator
+    coordinator.async_start_recording(path)
+    for _ in range(POLLS):
+        fake_controller.churn(1)
+        await coordinator.async_refresh()
+    recorded = coordinator.data
+    await coordinator.async_stop_recording()
+    assert await hass.config_entries.async_remove(entry.entry_id)
+
+    recording = await hass.async_add_executor_job(IqTecRecording.load, path)
+    client = IqTecReplayClient(hass, recording)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": "replay", "cover_use_short_tilt": False},
+        pref_disable_polling=True,
+    )
+    entry.add_to_hass(hass)
+    with (
+        patch("custom_components.iqtec.IqTecApiClient", return_value=client),
+        patch(
+            "custom_components.iqtec.IqTecDiscoveryCache.async_load",
+            return_value=recording.topology,
+        ),
+        patch("custom_components.iqtec._async_revalidate"),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    coordinator = entry.runtime_data.coordinator
+    assert await client.async_replay(coordinator, realtime=False) == POLLS + 1
+    replayed = coordinator.data
+    assert replayed.rooms == recorded.rooms
+    assert replayed.sunblinds == recorded.sunblinds
+    assert replayed.apis
+    assert replayed.apis == {idx: recorded.apis[idx] for idx in replayed.apis}
+    assert await hass.config_entries.async_unload(entry.entry_id)
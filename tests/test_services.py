@@ -0,0 +1,175 @@
+"""Tests of the IQtec services."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from unittest.mock import PropertyMock, patch
+
+from piqtec.constants import SUNBLIND_EXTENDED, SUNBLIND_TILT_CLOSED
+import pytest
+
+from custom_components.iqtec.const import CONF_IDLE_INTERVAL, DOMAIN
+from custom_components.iqtec.coordinator import IqTecCoordinator
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+
+from benchmarks.fake_controller import FakeController
+
+from .common import async_setup_entry
+
+
+@pytest.mark.parametrize("fake_controller", [(1, 4, 0)], indirect=True)
+async def test_set_cover_positions_with_tilt(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """Sunblinds reach the position, then the tilt of a single call."""
+    fake_controller.time_scale = 200
+    entry = await async_setup_entry(hass, fake_controller)
+    with patch("custom_components.iqtec.services.COVER_SETTLE_INTERVAL", 0.01):
+        await hass.services.async_call(
+            DOMAIN,
+            "set_cover_positions",
+            {
+                "config_entry_id": entry.entry_id,
+                "sunblinds": ["all"],
+                "position": 40,
+                "tilt_position": 50,
+            },
+            blocking=True,
+        )
+    # Let the tilt steps end
+    await asyncio.sleep(0.05)
+    position = round(SUNBLIND_EXTENDED * 0.6)
+    tilt_sunblinds = entry.runtime_data.coordinator.topology.tilt_sunblinds
+    assert len(tilt_sunblinds) == 2
+    for idx in fake_controller.sunblinds:
+        rotation = (
+            SUNBLIND_TILT_CLOSED // 2 if idx in tilt_sunblinds else SUNBLIND_TILT_CLOSED
+        )
+        assert fake_controller.sunblind_position(idx) == (position, rotation)
+
+
+async def test_profile(
+    hass: HomeAssistant, fake_controller: FakeController, tmp_path: Path
+) -> None:
+    """The profile covers the requested update cycles."""
+    hass.config.config_dir = str(tmp_path)
+    entry = await async_setup_entry(hass, fake_controller)
+    coordinator = entry.runtime_data.coordinator
+    call = hass.async_create_task(
+        hass.services.async_call(
+            DOMAIN,
+            "profile",
+            {"config_entry_id": entry.entry_id, "cycles": 2},
+            blocking=True,
+            return_response=True,
+        )
+    )
+    while coordinator.profiler is None:
+        await asyncio.sleep(0)
+    for _ in range(2):
+        await coordinator.async_refresh()
+    response = await call
+    assert response["cycles"] == 2
+    assert Path(response["profile"]).is_file()
+    assert Path(response["summary"]).is_file()
+    assert coordinator.profiler is None
+
+
+async def test_profile_timeout(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """Profiling gives up when the coordinator does not poll."""
+    entry = await async_setup_entry(hass, fake_controller, **{CONF_IDLE_INTERVAL: 0})
+    coordinator = entry.runtime_data.coordinator
+    with (
+        patch("custom_components.iqtec.coordinator.REQUEST_TIMEOUT", 0.01),
+        pytest.raises(HomeAssistantError, match="Profiled only 0 of 2"),
+    ):
+        await coordinator.async_profile("unused", 2)
+    assert coordinator.profiler is None
+
+
+async def test_profile_not_discovered(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """Profiling needs a discovered controller."""
+    entry = await async_setup_entry(hass, fake_controller)
+    with (
+        patch.object(IqTecCoordinator, "hub", PropertyMock(return_value=None)),
+        pytest.raises(HomeAssistantError, match="not been discovered"),
+    ):
+        await hass.services.async_call(
+            DOMAIN,
+            "profile",
+            {"config_entry_id": entry.entry_id},
+            blocking=True,
+            return_response=True,
+        )
+
+
+async def test_set_rooms(hass: HomeAssistant, fake_controller: FakeController) -> None:
+    """Several rooms are set with one request."""
+    entry = await async_setup_entry(hass, fake_controller)
+    client = entry.runtime_data.coordinator.client
+    with patch.object(client, "async_execute", wraps=client.async_execute) as execute:
+        await hass.services.async_call(
+            DOMAIN,
+            "set_rooms",
+            {
+                "config_entry_id": entry.entry_id,
+                "rooms": {
+                    fake_controller.rooms[0]: {"temperature": 23.5},
+                    "climate.room_1": {"temperature": 19},
+                },
+            },
+            blocking=True,
+        )
+    execute.assert_awaited_once()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    rooms = entry.runtime_data.coordinator.data.rooms
+    assert rooms[fake_controller.rooms[0]].correction_temperature == 23.5
+    assert rooms[fake_controller.rooms[1]].correction_temperature == 19
+
+
+async def test_write_apis(hass: HomeAssistant, fake_controller: FakeController) -> None:
+    """Several APIs are written with one request."""
+    entry = await async_setup_entry(hass, fake_controller)
+    client = entry.runtime_data.coordinator.client
+    with patch.object(client, "async_execute", wraps=client.async_execute) as execute:
+        await hass.services.async_call(
+            DOMAIN,
+            "write_apis",
+            {
+                "config_entry_id": entry.entry_id,
+                "values": {"D0.SWITCH4": 21.5, "D0.SWITCH6": 5},
+            },
+            blocking=True,
+        )
+    execute.assert_awaited_once()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert hass.states.get("number.d0_switch4").state == "21.5"
+    assert hass.states.get("number.d0_switch6").state == "5.0"
+
+
+async def test_write_apis_invalid(
+    hass: HomeAssistant, fake_controller: FakeController
+) -> None:
+    """Nothing is written when a value does not fit its API."""
+    entry = await async_setup_entry(hass, fake_controller)
+    client = entry.runtime_data.coordinator.client
+    with (
+        patch.object(client, "async_execute") as execute,
+        pytest.raises(ServiceValidationError, match="D0.SWITCH6"),
+    ):
+        await hass.services.async_call(
+            DOMAIN,
+            "write_apis",
+            {
+                "config_entry_id": entry.entry_id,
+                "values": {"D0.SWITCH4": 21.5, "D0.SWITCH6": "warm"},
+            },
+            blocking=True,
+        )
+    execute.assert_not_called()